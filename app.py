@@ -2,21 +2,40 @@
 # -*- coding: utf-8 -*-
 
 import os
-import tempfile
+import zipfile
 from datetime import date
-from pathlib import Path
+from io import BytesIO
 
-import pandas as pd
 from flask import (
     Flask,
     render_template,
     request,
     send_file,
     jsonify,
+    url_for,
+)
+from packliste_core import (
+    MAIN_FIELDS,
+    JobQueue,
+    StageTimer,
+    auto_stem_from_df,
+    convert_batch,
+    convert_by_day,
+    convert_bytes,
+    convert_records,
+    convert_split,
+    convert_upload,
+    load_dichtungen,
+    load_template,
+    parse_upload,
+    preview_dataframe,
+    preview_upload,
+    read_export,
+    read_input_file,
+    records_to_dataframe,
+    result_cache,
+    save_dichtungen,
 )
-from werkzeug.utils import secure_filename
-
-from packliste_core import convert_file, load_dichtungen, save_dichtungen
 
 # -------------------------------------------------------
 # Flask-App
@@ -25,6 +44,19 @@ app = Flask(__name__)
 
 ALLOWED_EXTENSIONS = {"xlsx", "xls", "csv"}
 
+# Laufzeiten je Konvertierungsschritt protokollieren und als Header mitsenden
+TIMING_HEADER = "X-Packliste-Timings"
+TIMING_ENABLED = os.environ.get("PACKLISTE_TIMINGS", "") == "1"
+
+# Lokaler Worker-Pool für asynchrone Konvertierungen (/jobs)
+jobs = JobQueue()
+
+# Vorlage beim Start einmal parsen, damit die erste Konvertierung den Cache schon vorfindet
+try:
+    load_template()
+except FileNotFoundError as e:
+    print("Vorlage konnte nicht vorgeladen werden:", e)
+
 
 def allowed(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -37,74 +69,15 @@ def allowed(filename: str) -> bool:
 def suggest_auto_stem(input_path: str) -> str | None:
     """
     Liest die Eingabedatei und erzeugt einen Dateinamen-Stamm wie
-    'DanielOberrauner_24-11-2025-28-11-2025'.
+    'DanielOberrauner_24112025-28112025'.
     Gibt None zurück, wenn etwas schiefgeht.
     """
     try:
-        ext = os.path.splitext(input_path)[1].lower()
-        if ext == ".csv":
-            df = pd.read_csv(input_path, sep=";", engine="python", header=0)
-        else:
-            df = pd.read_excel(input_path, header=0)
+        # für den Namen genügen die Hauptfelder
+        df = read_input_file(input_path, columns=MAIN_FIELDS)
     except Exception:
         return None
-
-    def safe_val(df_, col, index):
-        if col not in df_.columns or index < 0 or index >= len(df_):
-            return ""
-        val = df_[col].iloc[index]
-        if pd.isna(val):
-            return ""
-        return str(val)
-
-    def parse_date_part(value):
-        import re as _re
-
-        if not isinstance(value, str):
-            value = str(value)
-        m = _re.match(r"^(\d{1,2}\.\d{1,2}\.\d{4})", value.strip())
-        if not m:
-            return None
-        ds = m.group(1)
-        try:
-            return pd.to_datetime(ds, dayfirst=True, errors="coerce")
-        except Exception:
-            return None
-
-    def get_zeitraum_von_bis(df_, col="Zeitraum"):
-        if col not in df_.columns:
-            return ""
-        dtlist = []
-        for val in df_[col].dropna():
-            dt = parse_date_part(val)
-            if dt is not None:
-                dtlist.append(dt)
-        if not dtlist:
-            return ""
-        von_dt = min(dtlist)
-        bis_dt = max(dtlist)
-        # mit Bindestrich statt " - ", damit es im Dateinamen sauber ist
-        return f"{von_dt.strftime('%d.%m.%Y')}-{bis_dt.strftime('%d.%m.%Y')}"
-
-    serv = safe_val(df, "Service Techniker", 3)
-    date_range = get_zeitraum_von_bis(df, "Zeitraum")
-
-    if not serv and not date_range:
-        return None
-
-    def sanitize(text: str) -> str:
-        # nur Buchstaben, Zahlen, Unterstrich und Minus
-        return "".join(c for c in text if c.isalnum() or c in ("_", "-"))
-
-    serv_sanitized = sanitize(serv) or "Packliste"
-    date_sanitized = sanitize(date_range.replace(" ", "")) if date_range else ""
-
-    if date_sanitized:
-        stem = f"{serv_sanitized}_{date_sanitized}"
-    else:
-        stem = serv_sanitized
-
-    return stem or None
+    return auto_stem_from_df(df)
 
 
 # -------------------------------------------------------
@@ -126,49 +99,355 @@ def index():
             error = "Ungültiges Dateiformat. Erlaubt sind: .xlsx, .xls, .csv"
             return render_template("index.html", error=error)
 
-        # Temporäres Arbeitsverzeichnis
-        tmpdir = Path(tempfile.mkdtemp(prefix="packliste_"))
-        input_path = tmpdir / secure_filename(upload.filename)
-        upload.save(input_path)
-
-        # Dateinamen-Stamm:
-        # 1. Wenn der User etwas eingibt -> das verwenden
-        # 2. Sonst automatisch aus Service Techniker + Zeitraum
-        # 3. Fallback: Packliste_YYYYMMDD
-        if desired_stem:
-            stem = desired_stem
-        else:
-            stem = suggest_auto_stem(str(input_path))
-            if not stem:
-                stem = f"Packliste_{date.today():%Y%m%d}"
-
-        output_path = tmpdir / f"{stem}.xlsx"
+        if request.form.get("split_by_technician"):
+            return split_upload(upload, desired_stem)
+        if request.form.get("by_day"):
+            return day_upload(upload, desired_stem)
 
         try:
+            # Upload im Speicher konvertieren – keine temporären Dateien pro Anfrage.
+            # Identische Uploads kommen direkt aus dem Ergebnis-Cache.
             user_dichtungen = load_dichtungen()
-            # packliste_core kümmert sich um alles – wir wollen keine Messageboxen
-            convert_file(str(input_path), str(output_path), user_dichtungen, show_message=False)
-
-            if not output_path.exists():
-                raise RuntimeError("Konvertierung hat keine neue Excel-Datei erzeugt.")
+            timer = StageTimer(enabled=TIMING_ENABLED)
+            xlsx, auto_stem = convert_bytes(upload.read(), upload.filename, user_dichtungen, timer=timer)
         except Exception as e:
             print("Fehler bei der Konvertierung:", e)
             error = f"Unerwarteter Fehler bei der Konvertierung: {e}"
             return render_template("index.html", error=error)
 
+        # Dateinamen-Stamm:
+        # 1. Wenn der User etwas eingibt -> das verwenden
+        # 2. Sonst automatisch aus Service Techniker + Zeitraum
+        # 3. Fallback: Packliste_YYYYMMDD
+        stem = desired_stem or auto_stem or f"Packliste_{date.today():%Y%m%d}"
+
         # Erfolgreich -> Datei direkt zum Download schicken
-        return send_file(
-            output_path,
+        response = send_file(
+            BytesIO(xlsx),
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             as_attachment=True,
             download_name=f"{stem}.xlsx",
         )
+        if TIMING_ENABLED:
+            timer.log(input=upload.filename)
+            response.headers[TIMING_HEADER] = timer.header_value()
+        return response
 
     # GET-Aufruf
     default_stem = f"Packliste_{date.today():%Y%m%d}"
     return render_template("index.html", error=None, default_stem=default_stem)
 
 
+def split_upload(upload, desired_stem):
+    """
+    Team-Export: eine Packliste je Service-Techniker, gesammelt als ZIP.
+    """
+    try:
+        user_dichtungen = load_dichtungen()
+        df = read_export(BytesIO(upload.read()), user_dichtungen, upload.filename)
+        zip_bytes, errors = convert_split(df, user_dichtungen)
+    except Exception as e:
+        print("Fehler bei der Konvertierung:", e)
+        error = f"Unerwarteter Fehler bei der Konvertierung: {e}"
+        return render_template("index.html", error=error)
+
+    # nur FEHLER.txt im ZIP -> kein Techniker konnte konvertiert werden
+    if errors and len(zipfile.ZipFile(BytesIO(zip_bytes)).namelist()) == 1:
+        error = "Keine Packliste konnte erzeugt werden: " + "; ".join(f"{fn}: {err}" for fn, err in errors)
+        return render_template("index.html", error=error)
+
+    stem = desired_stem or f"Packlisten_{date.today():%Y%m%d}"
+    return send_file(
+        BytesIO(zip_bytes),
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name=f"{stem}.zip",
+    )
+
+
+def day_upload(upload, desired_stem):
+    """
+    Wochen-/Monatsexport: eine Arbeitsmappe mit einem Blatt je Tag.
+    """
+    try:
+        user_dichtungen = load_dichtungen()
+        df = read_export(BytesIO(upload.read()), user_dichtungen, upload.filename)
+        output = BytesIO()
+        _, auto_stem = convert_by_day(df, output, user_dichtungen)
+    except Exception as e:
+        print("Fehler bei der Konvertierung:", e)
+        error = f"Unerwarteter Fehler bei der Konvertierung: {e}"
+        return render_template("index.html", error=error)
+
+    stem = desired_stem or auto_stem or f"Packliste_{date.today():%Y%m%d}"
+    output.seek(0)
+    return send_file(
+        output,
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=f"{stem}.xlsx",
+    )
+
+
+# -------------------------------------------------------
+# Stapelkonvertierung: mehrere Exporte -> ein ZIP
+# -------------------------------------------------------
+@app.route("/batch", methods=["POST"])
+def batch():
+    uploads = [u for u in request.files.getlist("input_files") if u and u.filename]
+
+    if not uploads:
+        error = "Bitte mindestens eine Packlisten-Datei auswählen (.xlsx / .xls / .csv)."
+        return render_template("index.html", error=error)
+
+    invalid = [u.filename for u in uploads if not allowed(u.filename)]
+    if invalid:
+        error = "Ungültiges Dateiformat: " + ", ".join(invalid) + ". Erlaubt sind: .xlsx, .xls, .csv"
+        return render_template("index.html", error=error)
+
+    try:
+        files = [(u.filename, u.read()) for u in uploads]
+        zip_bytes, errors = convert_batch(files, load_dichtungen())
+    except Exception as e:
+        print("Fehler bei der Stapelkonvertierung:", e)
+        error = f"Unerwarteter Fehler bei der Konvertierung: {e}"
+        return render_template("index.html", error=error)
+
+    if len(errors) == len(files):
+        error = "Keine der Dateien konnte konvertiert werden: " + "; ".join(f"{fn}: {err}" for fn, err in errors)
+        return render_template("index.html", error=error)
+
+    return send_file(
+        BytesIO(zip_bytes),
+        mimetype="application/zip",
+        as_attachment=True,
+        download_name=f"Packlisten_{date.today():%Y%m%d}.zip",
+    )
+
+
+# -------------------------------------------------------
+# Asynchrone Konvertierung: Job einreichen, Status abfragen, Ergebnis laden
+# -------------------------------------------------------
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    upload = request.files.get("input_file")
+    desired_stem = request.form.get("desired_name", "").strip()
+
+    if not upload or upload.filename == "":
+        return jsonify({"ok": False, "error": "Keine Datei übergeben"}), 400
+    if not allowed(upload.filename):
+        return jsonify({"ok": False, "error": "Ungültiges Dateiformat. Erlaubt sind: .xlsx, .xls, .csv"}), 400
+
+    try:
+        job_id = jobs.submit(upload.read(), upload.filename, load_dichtungen(), meta={"desired_stem": desired_stem})
+    except Exception as e:
+        print("Fehler beim Einreihen der Konvertierung:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+    return jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "status_url": url_for("job_status", job_id=job_id),
+        "download_url": url_for("job_download", job_id=job_id),
+    }), 202
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Unbekannter oder abgelaufener Job"}), 404
+    return jsonify({
+        "ok": True,
+        "job_id": job_id,
+        "status": job["status"],
+        "filename": job["filename"],
+        "error": job["error"],
+    })
+
+
+@app.route("/jobs/<job_id>/download")
+def job_download(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Unbekannter oder abgelaufener Job"}), 404
+    if job["status"] == "error":
+        return jsonify({"ok": False, "status": "error", "error": job["error"]}), 500
+    if job["status"] != "done":
+        return jsonify({"ok": False, "status": job["status"]}), 409
+
+    stem = job["meta"].get("desired_stem") or job["auto_stem"] or f"Packliste_{date.today():%Y%m%d}"
+    return send_file(
+        BytesIO(job["xlsx"]),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=f"{stem}.xlsx",
+    )
+
+
+# -------------------------------------------------------
+# Upload einmal einlesen, danach mit anderen Dichtungen neu rendern
+# -------------------------------------------------------
+def request_dichtungen():
+    """
+    Dichtungen für ein erneutes Rendern: aus dem JSON-Body (``{"dichtungen": [...]}``),
+    sonst der gespeicherte Katalog.
+    """
+    data = request.get_json(silent=True)
+    dichtungen = data.get("dichtungen") if isinstance(data, dict) else None
+    return dichtungen if isinstance(dichtungen, list) else load_dichtungen()
+
+
+@app.route("/uploads", methods=["POST"])
+def create_upload():
+    upload = request.files.get("input_file")
+
+    if not upload or upload.filename == "":
+        return jsonify({"ok": False, "error": "Keine Datei übergeben"}), 400
+    if not allowed(upload.filename):
+        return jsonify({"ok": False, "error": "Ungültiges Dateiformat. Erlaubt sind: .xlsx, .xls, .csv"}), 400
+
+    try:
+        token = parse_upload(upload.read(), upload.filename)
+    except Exception as e:
+        print("Fehler beim Einlesen:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+    return jsonify({
+        "ok": True,
+        "token": token,
+        "download_url": url_for("upload_download", token=token),
+        "preview_url": url_for("upload_preview", token=token),
+    }), 201
+
+
+@app.route("/uploads/<token>/download", methods=["GET", "POST"])
+def upload_download(token):
+    desired_stem = request.values.get("desired_name", "").strip()
+    try:
+        result = convert_upload(token, request_dichtungen())
+    except Exception as e:
+        print("Fehler bei der Konvertierung:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+    if result is None:
+        return jsonify({"ok": False, "error": "Unbekannter oder abgelaufener Upload"}), 404
+
+    xlsx, auto_stem = result
+    stem = desired_stem or auto_stem or f"Packliste_{date.today():%Y%m%d}"
+    return send_file(
+        BytesIO(xlsx),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=f"{stem}.xlsx",
+    )
+
+
+# -------------------------------------------------------
+# Vorschau: Spalten, Summen und Zeilen ohne Excel-Datei
+# -------------------------------------------------------
+def preview_response(preview, download_url=None):
+    # ?format=html liefert eine Tabelle, sonst JSON
+    if request.values.get("format") == "html":
+        positions = [i for i, col in enumerate(preview["columns"]) if not col["hidden"]]
+        return render_template("preview.html", preview=preview, positions=positions, download_url=download_url)
+    return jsonify({"ok": True, **preview})
+
+
+@app.route("/preview", methods=["POST"])
+def preview():
+    upload = request.files.get("input_file")
+
+    if not upload or upload.filename == "":
+        return jsonify({"ok": False, "error": "Keine Datei übergeben"}), 400
+    if not allowed(upload.filename):
+        return jsonify({"ok": False, "error": "Ungültiges Dateiformat. Erlaubt sind: .xlsx, .xls, .csv"}), 400
+
+    try:
+        user_dichtungen = load_dichtungen()
+        df = read_export(BytesIO(upload.read()), user_dichtungen, upload.filename)
+        result = preview_dataframe(df, user_dichtungen)
+    except Exception as e:
+        print("Fehler bei der Vorschau:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return preview_response(result)
+
+
+@app.route("/uploads/<token>/preview", methods=["GET", "POST"])
+def upload_preview(token):
+    try:
+        result = preview_upload(token, request_dichtungen())
+    except Exception as e:
+        print("Fehler bei der Vorschau:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+    if result is None:
+        return jsonify({"ok": False, "error": "Unbekannter oder abgelaufener Upload"}), 404
+    return preview_response(result, url_for("upload_download", token=token))
+
+
+# -------------------------------------------------------
+# Deal-Datensätze als JSON (ohne Excel-/CSV-Export)
+# -------------------------------------------------------
+def request_records():
+    """
+    Datensätze aus dem JSON-Body: eine Liste oder ``{"data": [...]}`` wie in der
+    Zoho-API. ``None``, wenn kein JSON übergeben wurde.
+    """
+    return request.get_json(silent=True)
+
+
+@app.route("/records", methods=["POST"])
+def records():
+    payload = request_records()
+    if payload is None:
+        return jsonify({"ok": False, "error": "JSON mit Deal-Datensätzen erwartet"}), 400
+    desired_stem = request.args.get("desired_name", "").strip()
+
+    try:
+        timer = StageTimer(enabled=TIMING_ENABLED)
+        xlsx, auto_stem = convert_records(payload, request_dichtungen(), timer=timer)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        print("Fehler bei der Konvertierung:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+    stem = desired_stem or auto_stem or f"Packliste_{date.today():%Y%m%d}"
+    response = send_file(
+        BytesIO(xlsx),
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name=f"{stem}.xlsx",
+    )
+    if TIMING_ENABLED:
+        timer.log(input="records")
+        response.headers[TIMING_HEADER] = timer.header_value()
+    return response
+
+
+@app.route("/records/preview", methods=["POST"])
+def records_preview():
+    payload = request_records()
+    if payload is None:
+        return jsonify({"ok": False, "error": "JSON mit Deal-Datensätzen erwartet"}), 400
+
+    try:
+        result = preview_dataframe(records_to_dataframe(payload), request_dichtungen())
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        print("Fehler bei der Vorschau:", e)
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return preview_response(result)
+
+
+# -------------------------------------------------------
+# Trefferquote des Ergebnis-Caches
+# -------------------------------------------------------
+@app.route("/cache-stats")
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+
 # -------------------------------------------------------
 # Dichtungen-Verwaltung (wird vom /dichtungen-Frontend genutzt)
 # -------------------------------------------------------
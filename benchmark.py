@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark für die Konvertierung mit synthetischen Zoho-Exporten.
+
+    python benchmark.py                               # Standard-Raster
+    python benchmark.py --rows 10,1000 --seals 5,200 --formats xlsx
+    python benchmark.py --output bench_vorher.json
+
+Erzeugt Exporte im Format der Zoho-Packliste (Hauptfelder, Dichtungsspalten aus
+``dichtungen.json``, Summenzeile an Index 0) als .xlsx und .csv, misst
+``convert_file`` und ``suggest_auto_stem`` und schreibt die Ergebnisse als JSON.
+Jeder Fall läuft in einem eigenen Prozess, damit der Spitzen-RSS-Wert pro Fall
+aussagekräftig ist.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = Path(__file__).resolve().parent
+
+DEFAULT_ROWS = [10, 100, 1000, 10000]
+DEFAULT_SEALS = [5, 50, 200]
+DEFAULT_FORMATS = ["xlsx", "csv"]
+
+MAIN_FIELDS = [
+    "Service Techniker",
+    "Zeitraum",
+    "Dealname",
+    "Weitere Techniker",
+    "Informationen Packliste",
+    "Ersatzteil und Zubehör",
+]
+
+# Zoho exportiert zusätzlich Spalten, die die Packliste nicht verwendet
+UNUSED_FIELDS = ["Datensatz-ID", "Besitzer", "Erstellt am", "Geändert am", "Phase"]
+
+TECHNICIANS = ["Daniel Oberrauner", "Anna Beispiel", "Max Muster"]
+
+
+# ------------------------------------------------------------
+# Synthetische Exporte
+# ------------------------------------------------------------
+
+def seal_names(count):
+    """
+    Dichtungsnamen aus ``dichtungen.json``, bei Bedarf um erfundene Namen ergänzt.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    from packliste_core import load_dichtungen
+
+    names = [d["name"] for d in load_dichtungen()][:count]
+    suffixes = ["S", "W", "G", "B"]
+    i = 0
+    while len(names) < count:
+        names.append(f"{20 + i // 4}/{i % 7 + 1}_{suffixes[i % 4]}")
+        i += 1
+    return names
+
+
+def make_export(n_rows, n_seals, seed=0):
+    """
+    Baut einen Export-DataFrame: Zeile 0 ist die Summenzeile, danach ``n_rows`` Termine.
+    """
+    rng = random.Random(seed)
+    seals = seal_names(n_seals)
+    technician = rng.choice(TECHNICIANS)
+    start = date(2025, 11, 24)
+
+    rows = []
+    for i in range(n_rows):
+        day = start + timedelta(days=rng.randint(0, 4))
+        hour = rng.randint(6, 16)
+        row = {
+            "Service Techniker": technician,
+            "Zeitraum": f"{day:%d.%m.%Y} {hour:02d}:00 - {hour + 1:02d}:00",
+            "Dealname": f"Filiale {rng.randint(100, 999)} – Kühlraum {i}",
+            "Weitere Techniker": rng.choice(["", "", "Hans Huber"]),
+            "Informationen Packliste": rng.choice([None, None, None, f"Hinweis {i}"]),
+            "Ersatzteil und Zubehör": rng.choice([None, None, None, None, "Scharnier"]),
+        }
+        for field in UNUSED_FIELDS:
+            row[field] = f"{field} {i}"
+        for j, name in enumerate(seals):
+            # etwa jede dritte Dichtung bleibt leer, die übrigen sind dünn besetzt
+            row[name] = None if j % 3 == 2 else rng.choice([None, None, None, 1, 2, 4])
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=MAIN_FIELDS + UNUSED_FIELDS + seals)
+    sums = {col: None for col in df.columns}
+    for name in seals:
+        sums[name] = pd.to_numeric(df[name], errors="coerce").sum()
+    return pd.concat([pd.DataFrame([sums]), df], ignore_index=True)
+
+
+def write_export(df, path):
+    if path.suffix == ".csv":
+        df.to_csv(path, sep=";", index=False)
+    else:
+        df.to_excel(path, index=False)
+
+
+# ------------------------------------------------------------
+# Messung (läuft im Kind-Prozess)
+# ------------------------------------------------------------
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KiB, macOS Bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_case(input_path, repeat):
+    sys.path.insert(0, str(BASE_DIR))
+    from app import suggest_auto_stem
+    from packliste_core import convert_file, load_template
+
+    load_template()  # Vorlage vorab parsen, wie beim Start der Web-App
+    output_path = str(Path(input_path).with_suffix(".out.xlsx"))
+
+    convert_times = []
+    stem_times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        convert_file(input_path, output_path)
+        convert_times.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        suggest_auto_stem(input_path)
+        stem_times.append(time.perf_counter() - t0)
+
+    os.remove(output_path)
+    return {
+        "convert_s": round(min(convert_times), 4),
+        "auto_stem_s": round(min(stem_times), 4),
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def run_case(input_path, repeat):
+    # eigener Prozess pro Fall, damit ru_maxrss nicht von vorherigen Fällen stammt
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_run_case, str(input_path), repeat).result()
+
+
+# ------------------------------------------------------------
+# Ablauf
+# ------------------------------------------------------------
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_int_list(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Konvertierungs-Benchmark mit synthetischen Exporten.")
+    parser.add_argument("--rows", type=parse_int_list, default=DEFAULT_ROWS,
+                        help="Zeilenzahlen, kommagetrennt (Standard: 10,100,1000,10000)")
+    parser.add_argument("--seals", type=parse_int_list, default=DEFAULT_SEALS,
+                        help="Anzahl Dichtungsspalten, kommagetrennt (Standard: 5,50,200)")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help="Eingabeformate, kommagetrennt (Standard: xlsx,csv)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Wiederholungen pro Fall, gewertet wird die schnellste (Standard: 1)")
+    parser.add_argument("--output", default=None,
+                        help="Ergebnisdatei (Standard: bench_<commit>.json)")
+    args = parser.parse_args(argv)
+
+    formats = [f.strip().lower() for f in args.formats.split(",") if f.strip()]
+    commit = git_commit()
+    stamp = commit or f"{datetime.now():%Y%m%d%H%M%S}"
+    output = Path(args.output or f"bench_{stamp}.json")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="packliste_bench_") as tmp:
+        for n_rows in args.rows:
+            for n_seals in args.seals:
+                df = make_export(n_rows, n_seals, seed=n_rows * 1000 + n_seals)
+                for fmt in formats:
+                    input_path = Path(tmp) / f"export_{n_rows}x{n_seals}.{fmt}"
+                    write_export(df, input_path)
+
+                    measured = run_case(input_path, args.repeat)
+                    result = {
+                        "rows": n_rows,
+                        "seals": n_seals,
+                        "format": fmt,
+                        "input_bytes": input_path.stat().st_size,
+                        **measured,
+                        "rows_per_s": round(n_rows / measured["convert_s"], 1),
+                    }
+                    results.append(result)
+                    print(
+                        f"{fmt:>4} {n_rows:>6} Zeilen × {n_seals:>3} Dichtungen: "
+                        f"{measured['convert_s']:.3f} s ({result['rows_per_s']} Zeilen/s), "
+                        f"Dateiname {measured['auto_stem_s'] * 1000:.1f} ms, "
+                        f"RSS {measured['peak_rss_kb']} KiB"
+                    )
+
+    payload = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Ergebnisse gespeichert in {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stapelkonvertierung über die Kommandozeile:
+
+    python packliste_batch.py export1.xlsx export2.csv ... -o packlisten.zip
+    python packliste_batch.py team_export.xlsx --split -o packlisten.zip
+    python packliste_batch.py export_monat.xlsx --by-day -o packliste_monat.xlsx
+
+Alle Dateien werden parallel konvertiert und als ein ZIP gespeichert. Mit
+``--split`` wird jeder Export nach Service Techniker aufgeteilt, mit ``--by-day``
+entsteht eine Arbeitsmappe mit einem Blatt je Tag.
+"""
+
+import argparse
+import sys
+from io import BytesIO
+from pathlib import Path
+
+from packliste_core import convert_batch, convert_by_day, convert_split, load_dichtungen, read_export
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mehrere Zoho-Exporte in Packlisten (ZIP) konvertieren.")
+    parser.add_argument("inputs", nargs="+", help="Export-Dateien (.xlsx / .xls / .csv)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Ziel-ZIP (Standard: packlisten.zip) bzw. mit --by-day Ziel-.xlsx")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Anzahl Prozesse (Standard: CPU-Kerne)")
+    parser.add_argument("--split", action="store_true", help="eine Packliste pro Service Techniker")
+    parser.add_argument("--by-day", action="store_true", help="eine Arbeitsmappe mit einem Blatt je Tag")
+    args = parser.parse_args(argv)
+
+    if args.by_day:
+        if len(args.inputs) != 1 or args.split:
+            parser.error("--by-day erwartet genau eine Export-Datei (ohne --split)")
+        user_dichtungen = load_dichtungen()
+        df = read_export(args.inputs[0], user_dichtungen)
+        output = BytesIO()
+        _, auto_stem = convert_by_day(df, output, user_dichtungen)
+        target = args.output or f"{auto_stem or 'Packliste'}.xlsx"
+        Path(target).write_bytes(output.getvalue())
+        print(f"Packliste nach {target} geschrieben.")
+        return 0
+
+    args.output = args.output or "packlisten.zip"
+
+    if args.split:
+        if len(args.inputs) != 1:
+            parser.error("--split erwartet genau eine Export-Datei")
+        user_dichtungen = load_dichtungen()
+        df = read_export(args.inputs[0], user_dichtungen)
+        zip_bytes, errors = convert_split(df, user_dichtungen, max_workers=args.jobs)
+        Path(args.output).write_bytes(zip_bytes)
+        print(f"Packlisten nach {args.output} geschrieben ({len(errors)} Fehler).")
+        return 1 if errors else 0
+
+    files = [(Path(p).name, Path(p).read_bytes()) for p in args.inputs]
+    zip_bytes, errors = convert_batch(files, load_dichtungen(), max_workers=args.jobs)
+    Path(args.output).write_bytes(zip_bytes)
+
+    print(f"{len(files) - len(errors)} von {len(files)} Packlisten nach {args.output} geschrieben.")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,56 +1,103 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
 import os
 import re
 import json
 import math
-import shutil
-import datetime
+import pickle
+import hashlib
+import time
+import uuid
+import tracemalloc
+import itertools
+import zipfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
 from pathlib import Path
-
-from copy import copy
-
-import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
-
-
-# ------------------------------------------------------------
-# Konfiguration & Konstanten
-# ------------------------------------------------------------
-
-TEMPLATE_FILE = "Packliste_Template.xlsx"
+
+from copy import copy, deepcopy
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import get_column_letter
+from pandas.io.parsers import TextParser
+
+
+# ------------------------------------------------------------
+# Konfiguration & Konstanten
+# ------------------------------------------------------------
+
+TEMPLATE_FILE = "Packliste_Template.xlsx"
 DICHTUNGEN_CONFIG = "dichtungen.json"
-
-SERVICE_TECHNIKER_ROW = 1
-DATE_ROW = 2
-
-TEMPLATE_SUM_ROW = 1
-TEMPLATE_DICHTUNG_NAME_ROW = 2
-TEMPLATE_DATA_START_ROW = 3
-
-DF_DATA_START_ROW = 1
-DF_SUM_ROW = 0
-
-PLATZHALTER_COL_INDEX = 5  # Spalte E im Template
-NUMBERING_COL = 1          # Spalte A
-
-weekday_map = {
-    0: "MO",
-    1: "DI",
-    2: "MI",
-    3: "DO",
-    4: "FR",
-    5: "SA",
-    6: "SO",
-}
-
-# Default-Liste, falls noch keine JSON vorhanden ist
-DEFAULT_DICHTUNGEN = []
-
-
+
+SERVICE_TECHNIKER_ROW = 1
+DATE_ROW = 2
+
+TEMPLATE_SUM_ROW = 1
+TEMPLATE_DICHTUNG_NAME_ROW = 2
+TEMPLATE_DATA_START_ROW = 3
+
+DF_DATA_START_ROW = 1
+DF_SUM_ROW = 0
+
+# Hauptfelder des Zoho-Exports, die in die Packliste übernommen werden
+MAIN_FIELDS = (
+    "Service Techniker",
+    "Zeitraum",
+    "Dealname",
+    "Weitere Techniker",
+    "Informationen Packliste",
+    "Ersatzteil und Zubehör",
+)
+
+# Hauptfelder und ihre Spalten in der Vorlage (vor dem Einfügen der Dichtungs-Spalten)
+TEMPLATE_MAINFIELD_COLS = (
+    ("Zeitraum", 2),                # B
+    ("Dealname", 3),                # C
+    ("Weitere Techniker", 4),       # D
+    ("Informationen Packliste", 6), # F
+    ("Ersatzteil und Zubehör", 7),  # G
+)
+
+# Hauptfelder, deren Spalte ausgeblendet wird, wenn sie komplett leer ist
+OPTIONAL_FIELDS = ("Weitere Techniker", "Informationen Packliste", "Ersatzteil und Zubehör")
+
+# Obergrenze für den Ergebnis-Cache (fertige .xlsx im Speicher)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("PACKLISTE_RESULT_CACHE_MB", "64")) * 1024 * 1024
+
+# Wie lange abgeschlossene Hintergrund-Jobs abrufbar bleiben (Sekunden)
+JOB_TTL_SECONDS = 3600
+
+# Eingelesene Uploads für erneutes Rendern (siehe UploadCache)
+UPLOAD_TTL_SECONDS = 15 * 60
+UPLOAD_CACHE_MAX_ENTRIES = 32
+
+PLATZHALTER_COL_INDEX = 5  # Spalte E im Template
+NUMBERING_COL = 1          # Spalte A
+
+weekday_map = {
+    0: "MO",
+    1: "DI",
+    2: "MI",
+    3: "DO",
+    4: "FR",
+    5: "SA",
+    6: "SO",
+}
+
+# Default-Liste, falls noch keine JSON vorhanden ist
+DEFAULT_DICHTUNGEN = []
+
+
 def resource_path(relative_path: str) -> str:
     """
     Liefert einen Pfad relativ zu dieser Datei (funktioniert auch auf dem Server).
@@ -67,345 +114,958 @@ def resource_path(relative_path: str) -> str:
 
     base = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base, relative_path)
-
-
-# ------------------------------------------------------------
-# Helper-Funktionen für Daten / Datumswerte
-# ------------------------------------------------------------
-
-def transform_zeitraum(val):
-    """
-    Wandelt '24.11.2025 08:00 - 09:00' in 'MO 24.11.25 08:00 - 09:00' um.
-    """
-    if not val or not isinstance(val, str):
-        return val
-    m = re.match(r'^(\d{1,2}\.\d{1,2}\.\d{4})(.*)$', val.strip())
-    if not m:
-        return val
-    date_str = m.group(1).strip()
-    rest = m.group(2)
-    try:
-        dt = datetime.datetime.strptime(date_str, "%d.%m.%Y")
-        wday = dt.weekday()
-        wday_abbr = weekday_map.get(wday, "")
-        date_formatted = dt.strftime("%d.%m.%y")
-        return f"{wday_abbr} {date_formatted}{rest}"
-    except Exception:
-        return val
-
-
-def safe_val(df, col, index):
-    """
-    Sichere DataFrame-Zugriffe, damit bei fehlenden Spalten/Zeilen kein Fehler entsteht.
-    """
-    if col not in df.columns:
-        return ""
-    if index < 0 or index >= len(df):
-        return ""
-    val = df[col].iloc[index]
-    if pd.isna(val):
-        return ""
-    return str(val)
-
-
-def parse_number(s):
-    try:
-        return float(str(s).replace(",", "."))
-    except Exception:
-        return 0.0
-
-
-def parse_date_part(value):
-    """
-    Holt aus einem String ein Datum im Format dd.mm.yyyy, z.B. '24.11.2025 08:00 - 09:00'.
-    """
-    if not value or not isinstance(value, str):
-        return None
-    match = re.match(r"^(\d{1,2}\.\d{1,2}\.\d{4})", value.strip())
-    if not match:
-        return None
-    date_str = match.group(1)
-    try:
-        dt = pd.to_datetime(date_str, dayfirst=True, errors="coerce")
-        return dt
-    except Exception:
-        return None
-
-
-def get_zeitraum_von_bis(df, col="Zeitraum"):
-    """
-    Ermittelt den Gesamtzeitraum 'von - bis' aus der Zeitraum-Spalte.
-    """
-    if col not in df.columns:
-        return ""
-    dtlist = []
-    for val in df[col].dropna():
-        dt = parse_date_part(str(val))
-        if dt is not None:
-            dtlist.append(dt)
-    if not dtlist:
-        return ""
-    von_dt = min(dtlist)
-    bis_dt = max(dtlist)
-    return f"{von_dt.strftime('%d.%m.%Y')} - {bis_dt.strftime('%d.%m.%Y')}"
-
-
-def spalte_leer(df, colname):
-    """
-    True, wenn die Spalte komplett leer ist (oder gar nicht existiert).
-    """
-    if colname not in df.columns:
-        return True
-    col_series = df[colname].dropna().astype(str).str.strip()
-    if len(col_series) == 0:
-        return True
-    return col_series.eq("").all()
-
-
-# ------------------------------------------------------------
-# Sortierlogik für Dichtungen
-# ------------------------------------------------------------
-
-def parse_numeric_part(name: str) -> float:
-    """
-    Extrahiert einen numerischen Teil, z.B. '10/5_S' -> 10.005, für sortierbare Reihenfolge.
-    """
-    m = re.search(r'(\d+)(?:/(\d+))?', name)
-    if m:
-        first = int(m.group(1))
-        second = int(m.group(2)) if m.group(2) else 0
-        return first + second / 1000.0
-    return 999999.0
-
-
-def parse_suffix_priority(name: str) -> int:
-    """
-    Sortier-Priorität nach Suffix: _S vor _W vor _G vor Rest.
-    """
-    sfx = ""
-    parts = name.rsplit("_", 1)
-    if len(parts) == 2 and parts[1].strip():
-        sfx = parts[1].strip().upper()
-    if sfx == "S":
-        return 0
-    elif sfx == "W":
-        return 1
-    elif sfx == "G":
-        return 2
-    else:
-        return 99
-
-
-def final_sort_dichtungen(dichtungen, df=None):
-    """
-    Sortiert die Dichtungen in sinnvoller Reihenfolge.
-    Standard-Dichtungen (always_show=True) zuerst.
-    """
-
-    def sort_key(d):
-        is_std = d.get("always_show", False)
-        order_str = str(d.get("order", "")).strip()
-        try:
-            order_val = int(order_str)
-        except ValueError:
-            order_val = None
-        name = d["name"]
-        suffix_prio = parse_suffix_priority(name)
-        numeric_val = parse_numeric_part(name)
-        alpha_name = name.lower()
-
-        if is_std:
-            group = 0
-            if order_val is not None:
-                return (group, 0, order_val)
-            else:
-                return (group, 1, numeric_val, alpha_name)
-        else:
-            group = 1
-            return (group, suffix_prio, numeric_val, alpha_name)
-
-    return sorted(dichtungen, key=sort_key)
-
-
-# ------------------------------------------------------------
-# Helper zum Kopieren von Formatierungen
-# ------------------------------------------------------------
-
-def copy_cell_style(src_cell, dst_cell):
-    if src_cell.font:
-        dst_cell.font = copy(src_cell.font)
-    if src_cell.border:
-        dst_cell.border = copy(src_cell.border)
-    if src_cell.fill:
-        dst_cell.fill = copy(src_cell.fill)
-    if src_cell.number_format:
-        dst_cell.number_format = src_cell.number_format
-    if src_cell.protection:
-        dst_cell.protection = copy(src_cell.protection)
-    if src_cell.alignment:
-        align = copy(src_cell.alignment)
-        align.wrap_text = True
-        dst_cell.alignment = align
-    else:
-        dst_cell.alignment = Alignment(wrap_text=True)
-
-
-def copy_entire_row_format(ws, src_row_idx, dst_row_idx):
-    """
-    Kopiert Formatierungen einer Zeile (inkl. Höhe) und leert die Inhalte.
-    """
-    ws.row_dimensions[dst_row_idx].height = None
-    max_col = ws.max_column
-    for col in range(1, max_col + 1):
-        sc = ws.cell(row=src_row_idx, column=col)
-        dc = ws.cell(row=dst_row_idx, column=col)
-        copy_cell_style(sc, dc)
-        dc.value = None
-
-
-def copy_column_with_style(ws, src_col_idx, dst_col_idx):
-    """
-    Kopiert eine komplette Spalte inkl. Formatierungen und Breite.
-    """
-    max_row = ws.max_row
-    for row in range(1, max_row + 1):
-        sc = ws.cell(row=row, column=src_col_idx)
-        dc = ws.cell(row=row, column=dst_col_idx)
-        copy_cell_style(sc, dc)
-        dc.value = sc.value
-    src_letter = get_column_letter(src_col_idx)
-    dst_letter = get_column_letter(dst_col_idx)
-    if ws.column_dimensions[src_letter].width:
-        ws.column_dimensions[dst_letter].width = ws.column_dimensions[src_letter].width
-
-
-def set_horizontal_dotted(ws, row_idx):
-    dotted_side = Side(style="dotted", color="999999")
-    max_col = ws.max_column
-    for col_idx in range(1, max_col + 1):
-        c = ws.cell(row=row_idx, column=col_idx)
-        b = copy(c.border) or Border()
-        b.top = dotted_side
-        b.bottom = dotted_side
-        c.border = b
-
-
-def set_bottom_thick(ws, row_idx):
-    thick_side = Side(style="medium")
-    max_col = ws.max_column
-    for col_idx in range(1, max_col + 1):
-        c = ws.cell(row=row_idx, column=col_idx)
-        b = copy(c.border) or Border()
-        b.bottom = thick_side
-        c.border = b
-
-
-def set_top_border_solid(ws, row_idx):
-    thin_side = Side(style="thin")
-    max_col = ws.max_column
-    for col_idx in range(1, max_col + 1):
-        c = ws.cell(row=row_idx, column=col_idx)
-        b = copy(c.border) or Border()
-        b.top = thin_side
-        c.border = b
-
-
-def set_column_left_border(ws, col_idx, start_row=3, border_style="thin"):
-    side = Side(style=border_style, color="000000")
-    for row in range(start_row, ws.max_row + 1):
-        cell = ws.cell(row=row, column=col_idx)
-        b = copy(cell.border) or Border()
-        b.left = side
-        cell.border = b
-
-
-def set_bottom_solid(ws, row_idx):
-    side = Side(style="thin", color="000000")
-    max_col = ws.max_column
-    for col_idx in range(1, max_col + 1):
-        c = ws.cell(row=row_idx, column=col_idx)
-        b = copy(c.border) or Border()
-        b.bottom = side
-        c.border = b
-
-
-def remove_trailing_blank_rows(ws, start_row):
-    """
-    Löscht am Tabellenende komplett leere Zeilen.
-    """
-
-    def row_is_blank(r):
-        for col_idx in range(1, ws.max_column + 1):
-            val = ws.cell(row=r, column=col_idx).value
-            if val not in (None, ""):
-                return False
-        return True
-
-    last_row = ws.max_row
-    while last_row > start_row:
-        if row_is_blank(last_row):
-            ws.delete_rows(last_row, 1)
-        else:
-            break
-        last_row = ws.max_row
-
-
-# ------------------------------------------------------------
-# Dichtungs-Namen umbrechen & Spaltenbreiten
-# ------------------------------------------------------------
-
-def apply_dicht_name_break(name: str) -> str:
-    """
-    Versucht, Dichtungsnamen sinnvoll in max. 2 Zeilen umzubrechen.
-
-    - Wenn '_' vorhanden: Umbruch dort (z.B. '10/5_S' -> '10/5\nS').
-    - Sonst, wenn Leerzeichen vorhanden: Umbruch zwischen Wörtern
-      (z.B. 'Omega klebend' -> 'Omega\nklebend').
-    - Sonst: String ungefähr in der Mitte trennen.
-    """
-    if not name:
-        return ""
-    name = str(name).strip()
-
-    if "_" in name:
-        left, right = name.split("_", 1)
-        return left + "\n" + right
-
-    parts = name.split()
-    if len(parts) == 1:
-        if len(name) <= 8:
-            return name
-        half = math.ceil(len(name) / 2)
-        return name[:half] + "\n" + name[half:]
-    else:
-        if len(parts) == 2:
-            return parts[0] + "\n" + parts[1]
-        mid = math.ceil(len(parts) / 2)
-        line1 = " ".join(parts[:mid])
-        line2 = " ".join(parts[mid:])
-        return line1 + "\n" + line2
-
-
-def adjust_dichtung_column_widths(ws, dicht_col_map, max_width=12, min_width=6):
-    """
-    Setzt die Spaltenbreite der Dichtungs-Spalten so klein wie möglich,
-    ohne dass die Überschrift unsinnig oft umbrechen muss.
-    Orientiert sich an der Länge der längeren Zeile der Überschrift.
-    """
-    for name, col_idx in dicht_col_map.items():
-        header_cell = ws.cell(row=TEMPLATE_DICHTUNG_NAME_ROW, column=col_idx)
-        txt = str(header_cell.value) if header_cell.value is not None else ""
-        lines = txt.split("\n")
-        max_len = max((len(line) for line in lines), default=0)
-        width = max(min_width, min(max_width, max_len + 2))
-        col_letter = get_column_letter(col_idx)
-        ws.column_dimensions[col_letter].width = width
-
-
-# ------------------------------------------------------------
-# Laden / Speichern der Dichtungen
-# ------------------------------------------------------------
-
+
+
+# ------------------------------------------------------------
+# Helper-Funktionen für Daten / Datumswerte
+# ------------------------------------------------------------
+
+def safe_val(df, col, index):
+    """
+    Sichere DataFrame-Zugriffe, damit bei fehlenden Spalten/Zeilen kein Fehler entsteht.
+    """
+    if col not in df.columns:
+        return ""
+    if index < 0 or index >= len(df):
+        return ""
+    val = df[col].iloc[index]
+    if pd.isna(val):
+        return ""
+    return str(val)
+
+
+def technician_name(df):
+    """
+    Name des Service-Technikers: wie bisher aus Datenzeile 3, bei kürzeren
+    Exporten (oder leerer Zelle) der erste vorhandene Name der Spalte.
+    """
+    name = safe_val(df, "Service Techniker", 3)
+    if name or "Service Techniker" not in df.columns:
+        return name
+    names = df["Service Techniker"].iloc[DF_DATA_START_ROW:].dropna()
+    names = names[names.astype(str).str.strip() != ""]
+    return str(names.iloc[0]) if len(names) else ""
+
+
+def parse_number(s):
+    try:
+        return float(str(s).replace(",", "."))
+    except Exception:
+        return 0.0
+
+
+def parse_zeitraum(series):
+    """
+    Zerlegt die Zeitraum-Spalte in einem vektorisierten Durchlauf.
+
+    Rückgabe: DataFrame mit gleichem Index und den Spalten
+      - ``sort_key``: Datum + Startzeit, z.B. für die Sortierung der Termine
+      - ``date``: nur das Datum (für den Gesamtzeitraum von/bis)
+      - ``display``: Anzeigetext wie 'MO 24.11.25 08:00 - 09:00'
+        (Werte ohne gültiges Datum bleiben unverändert, leere Werte werden "").
+    """
+    raw = series.astype(object)
+    text = raw.where(raw.notna(), "").astype(str)
+    stripped = text.str.strip()
+
+    # Sortierschlüssel: Datum am Anfang, optional gefolgt von der Startzeit
+    parts = text.str.extract(r"^(\d{1,2}\.\d{1,2}\.\d{4})(?:\s+(\d{1,2}:\d{1,2}))?")
+    sort_key = pd.to_datetime(
+        parts[0] + " " + parts[1].fillna("00:00"), format="%d.%m.%Y %H:%M", errors="coerce"
+    )
+
+    # Datum für von/bis, Datum + Rest für die Anzeige
+    date_part = stripped.str.extract(r"^(\d{1,2}\.\d{1,2}\.\d{4})")[0]
+    date = pd.to_datetime(date_part, format="%d.%m.%Y", errors="coerce")
+    parts = stripped.str.extract(r"^(\d{1,2}\.\d{1,2}\.\d{4})(.*)$")
+    valid = date.notna() & parts[0].notna()
+    display = text.copy()
+    if valid.any():
+        display[valid] = (
+            date[valid].dt.weekday.map(weekday_map)
+            + " "
+            + date[valid].dt.strftime("%d.%m.%y")
+            + parts.loc[valid, 1]
+        )
+
+    return pd.DataFrame(
+        {"sort_key": sort_key, "date": date, "display": display}, index=series.index
+    )
+
+
+def get_zeitraum_von_bis(df, col="Zeitraum", zeitraum=None):
+    """
+    Ermittelt den Gesamtzeitraum 'von - bis' aus der Zeitraum-Spalte.
+    ``zeitraum`` ist optional das bereits berechnete Ergebnis von ``parse_zeitraum``.
+    """
+    if zeitraum is None:
+        if col not in df.columns:
+            return ""
+        zeitraum = parse_zeitraum(df[col])
+    dates = zeitraum["date"].dropna()
+    if dates.empty:
+        return ""
+    von_dt = dates.min()
+    bis_dt = dates.max()
+    return f"{von_dt.strftime('%d.%m.%Y')} - {bis_dt.strftime('%d.%m.%Y')}"
+
+
+def sort_by_zeitraum(df, zeitraum):
+    """
+    Sortiert die Datensätze nach Datum/Uhrzeit (Zeile 0 bleibt Summenzeile).
+    ``zeitraum`` (aus ``parse_zeitraum``) wird in derselben Reihenfolge mitsortiert.
+
+    Rückgabe: ``(df, zeitraum)`` jeweils mit neuem Index 0..n-1.
+    """
+    sort_keys = zeitraum["sort_key"].iloc[1:].reset_index(drop=True)
+    order = [0] + [pos + 1 for pos in sort_keys.sort_values(ascending=True).index]
+    df = df.iloc[order].reset_index(drop=True)
+    zeitraum = zeitraum.iloc[order].reset_index(drop=True)
+    return df, zeitraum
+
+
+def spalte_leer(df, colname):
+    """
+    True, wenn die Spalte komplett leer ist (oder gar nicht existiert).
+    """
+    if colname not in df.columns:
+        return True
+    col_series = df[colname].dropna().astype(str).str.strip()
+    if len(col_series) == 0:
+        return True
+    return col_series.eq("").all()
+
+
+def empty_column_mask(df):
+    """
+    Prüft alle Spalten in einem Durchlauf, ob sie komplett leer sind (gleiche
+    Regel wie ``spalte_leer``). Zahlen- und Datumsspalten brauchen dafür nur
+    ``notna``; nur Textspalten werden spaltenweise auf Leerstrings geprüft.
+
+    Rückgabe: dict Spaltenname -> True, wenn die Spalte leer ist.
+    Für Spalten, die nicht im Dict stehen, gilt wie bei ``spalte_leer``: leer.
+    """
+    mask = {}
+    for pos, col in enumerate(df.columns):
+        series = df.iloc[:, pos]
+        dtype = series.dtype
+        if (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)
+                or pd.api.types.is_timedelta64_dtype(dtype)):
+            filled = series.notna().any()
+        else:
+            filled = series.dropna().astype(str).str.strip().ne("").any()
+        mask[col] = not filled
+    return mask
+
+
+# ------------------------------------------------------------
+# Sortierlogik für Dichtungen
+# ------------------------------------------------------------
+
+def parse_numeric_part(name: str) -> float:
+    """
+    Extrahiert einen numerischen Teil, z.B. '10/5_S' -> 10.005, für sortierbare Reihenfolge.
+    """
+    m = re.search(r'(\d+)(?:/(\d+))?', name)
+    if m:
+        first = int(m.group(1))
+        second = int(m.group(2)) if m.group(2) else 0
+        return first + second / 1000.0
+    return 999999.0
+
+
+def parse_suffix_priority(name: str) -> int:
+    """
+    Sortier-Priorität nach Suffix: _S vor _W vor _G vor Rest.
+    """
+    sfx = ""
+    parts = name.rsplit("_", 1)
+    if len(parts) == 2 and parts[1].strip():
+        sfx = parts[1].strip().upper()
+    if sfx == "S":
+        return 0
+    elif sfx == "W":
+        return 1
+    elif sfx == "G":
+        return 2
+    else:
+        return 99
+
+
+@lru_cache(maxsize=4096)
+def _name_sort_parts(name: str):
+    # Regex-Auswertung pro Name nur einmal
+    return parse_suffix_priority(name), parse_numeric_part(name), name.lower()
+
+
+def _dichtung_sort_key(name, always_show, order):
+    """
+    Sortierschlüssel: Standard-Dichtungen zuerst (nach 'order', sonst nach Zahl/Name),
+    danach die übrigen nach Suffix, Zahl und Name.
+    """
+    order_str = str(order).strip()
+    try:
+        order_val = int(order_str)
+    except ValueError:
+        order_val = None
+    suffix_prio, numeric_val, alpha_name = _name_sort_parts(str(name))
+
+    if always_show:
+        group = 0
+        if order_val is not None:
+            return (group, 0, order_val)
+        else:
+            return (group, 1, numeric_val, alpha_name)
+    else:
+        group = 1
+        return (group, suffix_prio, numeric_val, alpha_name)
+
+
+class Dichtung:
+    """
+    Eine Dichtung aus dem Katalog mit vorab ausgewerteten Feldern
+    (Überschrift mit Umbruch, numerischer Vorgabewert, Sortierschlüssel, "Tag"-Flag).
+
+    Wird einmal beim Laden erzeugt; das JSON-Format bleibt über ``from_dict`` /
+    ``to_dict`` unverändert.
+    """
+
+    __slots__ = (
+        "name",
+        "always_show",
+        "default_value",
+        "order",
+        "header",
+        "default_num",
+        "sort_key",
+        "is_tag",
+    )
+
+    def __init__(self, name, always_show=False, default_value=0, order=""):
+        self.name = name
+        self.always_show = bool(always_show)
+        self.default_value = default_value
+        self.order = order
+        self.header = apply_dicht_name_break(name)
+        try:
+            self.default_num = float(default_value)
+        except Exception:
+            self.default_num = 0.0
+        self.sort_key = _dichtung_sort_key(name, self.always_show, order)
+        self.is_tag = str(name).strip().lower() == "tag"
+
+    @classmethod
+    def from_dict(cls, d):
+        if isinstance(d, cls):
+            return d
+        if not isinstance(d, dict):
+            return cls(d)
+        return cls(
+            d.get("name"),
+            always_show=d.get("always_show", False),
+            default_value=d.get("default_value", 0),
+            order=d.get("order", ""),
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "always_show": self.always_show,
+            "default_value": self.default_value,
+            "order": self.order,
+        }
+
+    def __repr__(self):
+        return f"Dichtung({self.name!r})"
+
+
+def as_dichtungen(dichtungen):
+    """
+    Wandelt eine Liste von Dicts (JSON-Format) in ``Dichtung``-Objekte um.
+    Für die gecachte Liste aus ``load_dichtungen`` werden die beim Laden
+    erzeugten Objekte zurückgegeben.
+    """
+    with _dichtungen_lock:
+        if dichtungen is _dichtungen_cache["items"]:
+            return _dichtungen_cache["records"]
+    return [Dichtung.from_dict(d) for d in dichtungen]
+
+
+def select_visible_dichtungen(dichtungen, df, empty_mask=None):
+    """
+    Liefert die Dichtungen, die als Spalte erscheinen: ohne "Tag",
+    Nicht-Standard-Dichtungen nur, wenn die Spalte Werte enthält.
+    ``empty_mask`` ist das Ergebnis von ``empty_column_mask`` (wird sonst berechnet).
+    """
+    if empty_mask is None:
+        empty_mask = empty_column_mask(df)
+    visible = []
+    for d in as_dichtungen(dichtungen):
+        if not d.name or d.is_tag:
+            continue
+        # Nicht-Standard-Dichtungen nur anzeigen, wenn Werte vorhanden
+        if (not d.always_show) and empty_mask.get(d.name, True):
+            continue
+        visible.append(d)
+    return visible
+
+
+def final_sort_dichtungen(dichtungen, df=None):
+    """
+    Sortiert die Dichtungen in sinnvoller Reihenfolge und liefert ``Dichtung``-Objekte.
+    Standard-Dichtungen (always_show=True) zuerst.
+
+    Für die unveränderte Liste aus ``load_dichtungen`` wird die beim Laden
+    vorberechnete Reihenfolge verwendet.
+    """
+    with _dichtungen_lock:
+        if dichtungen is _dichtungen_cache["items"]:
+            return list(_dichtungen_cache["sorted"])
+    return sorted(as_dichtungen(dichtungen), key=lambda d: d.sort_key)
+
+
+# ------------------------------------------------------------
+# Helper zum Kopieren von Formatierungen
+# ------------------------------------------------------------
+
+class StyleRegistry:
+    """
+    Interniert Style-Objekte für eine Konvertierung.
+
+    Jede Kombination aus Font/Alignment/PatternFill/Side bzw. jede abgeleitete
+    Rahmen- oder Schriftvariante wird nur einmal gebaut und danach wiederverwendet.
+    Abgeleitete Varianten werden über die Style-IDs der Quellzelle gecacht, eine
+    Registry gehört deshalb immer zu genau einer Arbeitsmappe.
+
+    ``apply`` merkt sich außerdem den Index jedes Objekts in der Arbeitsmappe,
+    damit openpyxl es nicht bei jeder Zuweisung erneut hashen und suchen muss.
+    """
+
+    _COLLECTIONS = {
+        "font": ("_fonts", "fontId"),
+        "fill": ("_fills", "fillId"),
+        "border": ("_borders", "borderId"),
+        "alignment": ("_alignments", "alignmentId"),
+    }
+
+    def __init__(self, wb):
+        self.wb = wb
+        self._ids = {}
+        self._fonts = {}
+        self._alignments = {}
+        self._fills = {}
+        self._sides = {}
+        self._wrapped_alignments = {}
+        self._borders = {}
+        self._recolored_fonts = {}
+
+    def font(self, **kw):
+        key = tuple(sorted(kw.items()))
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = Font(**kw)
+        return font
+
+    def alignment(self, **kw):
+        key = tuple(sorted(kw.items()))
+        align = self._alignments.get(key)
+        if align is None:
+            align = self._alignments[key] = Alignment(**kw)
+        return align
+
+    def fill(self, color):
+        fill = self._fills.get(color)
+        if fill is None:
+            fill = self._fills[color] = PatternFill("solid", fgColor=color)
+        return fill
+
+    def side(self, style, color=None):
+        key = (style, color)
+        side = self._sides.get(key)
+        if side is None:
+            side = self._sides[key] = Side(style=style, color=color)
+        return side
+
+    def wrapped_alignment(self, cell):
+        """Alignment der Zelle mit ``wrap_text=True``."""
+        key = _style_array(cell).alignmentId
+        align = self._wrapped_alignments.get(key)
+        if align is None:
+            align = copy(cell.alignment)
+            align.wrap_text = True
+            self._wrapped_alignments[key] = align
+        return align
+
+    def border_with(self, cell, **sides):
+        """Rahmen der Zelle, bei dem die angegebenen Seiten ersetzt sind."""
+        key = (_style_array(cell).borderId, tuple(sorted(sides.items(), key=lambda kv: kv[0])))
+        border = self._borders.get(key)
+        if border is None:
+            border = copy(cell.border) or Border()
+            for attr, side in sides.items():
+                setattr(border, attr, side)
+            self._borders[key] = border
+        return border
+
+    def apply(self, cell, **style_objects):
+        """
+        Weist der Zelle Objekte aus dieser Registry zu
+        (``font=``, ``fill=``, ``border=``, ``alignment=``).
+        """
+        if cell._style is None:
+            cell._style = StyleArray()
+        for attr, obj in style_objects.items():
+            coll_name, key = self._COLLECTIONS[attr]
+            idx = self._ids.get(id(obj))
+            if idx is None:
+                idx = self._ids[id(obj)] = getattr(self.wb, coll_name).add(obj)
+            setattr(cell._style, key, idx)
+
+    def font_with_color(self, cell, color):
+        """Schrift der Zelle in einer anderen Farbe."""
+        key = (_style_array(cell).fontId, color)
+        font = self._recolored_fonts.get(key)
+        if font is None:
+            font = copy(cell.font)
+            font.color = color
+            self._recolored_fonts[key] = font
+        return font
+
+
+def _style_array(cell):
+    # frisch angelegte, nie gestylte Zellen haben noch kein StyleArray (alle IDs 0)
+    return cell._style or StyleArray()
+
+
+def copy_cell_style(src_cell, dst_cell, styles=None):
+    styles = styles or StyleRegistry(dst_cell.parent.parent)
+    # Font, Border, Fill, Zahlenformat und Schutz in einem Schritt übernehmen
+    dst_cell._style = copy(_style_array(src_cell))
+    styles.apply(dst_cell, alignment=styles.wrapped_alignment(src_cell))
+
+
+def copy_entire_row_format(ws, src_row_idx, dst_row_idx, styles=None):
+    """
+    Kopiert Formatierungen einer Zeile (inkl. Höhe) und leert die Inhalte.
+    """
+    styles = styles or StyleRegistry(ws.parent)
+    ws.row_dimensions[dst_row_idx].height = None
+    max_col = ws.max_column
+    for col in range(1, max_col + 1):
+        sc = ws.cell(row=src_row_idx, column=col)
+        dc = ws.cell(row=dst_row_idx, column=col)
+        copy_cell_style(sc, dc, styles)
+        dc.value = None
+
+
+def copy_column_with_style(ws, src_col_idx, dst_col_idx, count=1, styles=None):
+    """
+    Kopiert eine komplette Spalte inkl. Formatierungen und Breite
+    in ``count`` aufeinanderfolgende Zielspalten ab ``dst_col_idx``.
+    Alle Zielspalten werden in einem Durchlauf über die Zeilen befüllt.
+    """
+    styles = styles or StyleRegistry(ws.parent)
+    dst_cols = range(dst_col_idx, dst_col_idx + count)
+    max_row = ws.max_row
+    for row in range(1, max_row + 1):
+        sc = ws.cell(row=row, column=src_col_idx)
+        for col in dst_cols:
+            dc = ws.cell(row=row, column=col)
+            copy_cell_style(sc, dc, styles)
+            dc.value = sc.value
+    src_letter = get_column_letter(src_col_idx)
+    src_width = ws.column_dimensions[src_letter].width
+    if src_width:
+        for col in dst_cols:
+            ws.column_dimensions[get_column_letter(col)].width = src_width
+
+
+def set_bottom_thick(ws, row_idx, styles=None):
+    styles = styles or StyleRegistry(ws.parent)
+    thick_side = styles.side("medium")
+    max_col = ws.max_column
+    for col_idx in range(1, max_col + 1):
+        c = ws.cell(row=row_idx, column=col_idx)
+        styles.apply(c, border=styles.border_with(c, bottom=thick_side))
+
+
+def set_top_border_solid(ws, row_idx, styles=None):
+    styles = styles or StyleRegistry(ws.parent)
+    thin_side = styles.side("thin")
+    max_col = ws.max_column
+    for col_idx in range(1, max_col + 1):
+        c = ws.cell(row=row_idx, column=col_idx)
+        styles.apply(c, border=styles.border_with(c, top=thin_side))
+
+
+def set_column_left_border(ws, col_idx, start_row=3, border_style="thin", styles=None):
+    styles = styles or StyleRegistry(ws.parent)
+    side = styles.side(border_style, "000000")
+    for row in range(start_row, ws.max_row + 1):
+        cell = ws.cell(row=row, column=col_idx)
+        styles.apply(cell, border=styles.border_with(cell, left=side))
+
+
+def set_bottom_solid(ws, row_idx, styles=None):
+    styles = styles or StyleRegistry(ws.parent)
+    side = styles.side("thin", "000000")
+    max_col = ws.max_column
+    for col_idx in range(1, max_col + 1):
+        c = ws.cell(row=row_idx, column=col_idx)
+        styles.apply(c, border=styles.border_with(c, bottom=side))
+
+
+class DataRowWriter:
+    """
+    Schreibt Datenzeilen in einem Durchlauf: Werte, Schrift, Ausrichtung,
+    gepunktete Linien und Zebra-Hintergrund werden pro Zelle genau einmal gesetzt.
+
+    Der Stil jeder Spalte wird vorab aus der Vorlagenzeile ``template_row``
+    abgeleitet; pro Spalte gibt es nur noch wenige fertige Varianten
+    (Zeilenparität × Zahlenformat), die jeder Zelle als Ganzes zugewiesen werden.
+    """
+
+    def __init__(self, ws, styles, template_row, max_col):
+        self.ws = ws
+        self.styles = styles
+        self.max_col = max_col
+        self.first_row = template_row
+        self._protos = {}
+        self._variants = {}
+        self._first_row_formats = {}
+        dotted = styles.side("dotted", "999999")
+        for col_idx in range(1, max_col + 1):
+            proto = Cell(ws)
+            copy_cell_style(ws.cell(row=template_row, column=col_idx), proto, styles)
+            styles.apply(proto, border=styles.border_with(proto, top=dotted, bottom=dotted))
+            self._protos[col_idx] = proto
+        self._fills = {True: styles.fill("DDDDDD"), False: styles.fill("FFFFFF")}
+
+    def set_column_style(self, col_idx, **style_objects):
+        """Legt Schrift/Ausrichtung einer Spalte für alle Datenzeilen fest."""
+        self.styles.apply(self._protos[col_idx], **style_objects)
+
+    def _style_for(self, col_idx, odd, numeric):
+        # Zahlenformat "0" bei Zahlen, sonst das Format der ersten Datenzeile
+        # (die Vorlage für alle weiteren Zeilen)
+        if numeric:
+            number_format = "0"
+        else:
+            number_format = self._first_row_formats.get(col_idx)
+        key = (col_idx, odd, number_format)
+        style = self._variants.get(key)
+        if style is None:
+            proto = self._protos[col_idx]
+            variant = Cell(self.ws)
+            variant._style = copy(_style_array(proto))
+            self.styles.apply(variant, fill=self._fills[odd])
+            if number_format is not None:
+                variant.number_format = number_format
+            style = self._variants[key] = variant._style
+        return style
+
+    def iter_row(self, values, odd, numeric, first=False):
+        """
+        Liefert ``(Spalte, Stil, Wert)`` für alle Zellen einer Datenzeile.
+        ``values`` und ``numeric`` sind Tupel mit einem Eintrag je Spalte
+        (siehe ``prepare_data_rows``).
+        """
+        for col_idx, value, is_num in zip(range(1, self.max_col + 1), values, numeric):
+            yield col_idx, self._style_for(col_idx, odd, is_num), value
+            if first and is_num:
+                self._first_row_formats[col_idx] = "0"
+
+    def write_row(self, row_idx, values, odd, numeric):
+        ws = self.ws
+        ws.row_dimensions[row_idx].height = None
+        first = row_idx == self.first_row
+        for col_idx, style, value in self.iter_row(values, odd, numeric, first):
+            cell = ws.cell(row=row_idx, column=col_idx)
+            cell._style = copy(style)
+            cell.value = value
+
+    def stream_row(self, out_ws, values, odd, numeric):
+        """Hängt eine Datenzeile an ein write-only-Arbeitsblatt an."""
+        row = []
+        for _, style, value in self.iter_row(values, odd, numeric):
+            cell = WriteOnlyCell(out_ws, value=value)
+            cell._style = copy(style)
+            row.append(cell)
+        out_ws.append(row)
+
+
+def _text_column(series):
+    # wie safe_val: fehlende Werte -> "", sonst str(Wert)
+    values = series.to_numpy(dtype=object)
+    missing = pd.isna(series).to_numpy()
+    return ["" if na else str(v) for v, na in zip(values, missing)]
+
+
+def _dicht_cell(raw):
+    # Menge als gerundete Zahl, sonst der Originalwert (z. B. Text oder NaN)
+    try:
+        return round(float(raw)), True
+    except Exception:
+        return raw, False
+
+
+def _dicht_column(series):
+    """
+    Bereitet eine Dichtungsspalte vor: ``(werte, ist_zahl)`` als Listen.
+    Numerische Spalten werden vektorisiert gerundet, gemischte Spalten pro
+    eindeutigem Wert einmal umgewandelt.
+    """
+    raw = series.to_numpy(dtype=object)
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        floats = series.to_numpy(dtype=float, na_value=np.nan)
+        finite = np.isfinite(floats)
+        if not finite.any() or np.abs(floats[finite]).max() < 2 ** 53:
+            rounded = np.rint(np.where(finite, floats, 0)).astype(np.int64).tolist()
+            values = [r if ok else v for r, v, ok in zip(rounded, raw, finite.tolist())]
+            return values, finite.tolist()
+
+    values, numeric = [], []
+    memo = {}
+    for v in raw:
+        try:
+            converted = memo[v]
+        except (KeyError, TypeError):
+            converted = _dicht_cell(v)
+            try:
+                memo[v] = converted
+            except TypeError:
+                pass
+        values.append(converted[0])
+        numeric.append(converted[1])
+    return values, numeric
+
+
+def prepare_data_rows(df, zeitraum, mainfield_by_col, dicht_by_col, max_col):
+    """
+    Wandelt die Datenzeilen des DataFrames spaltenweise in fertige Zellwerte um
+    und liefert je Zeile ``(values, odd, numeric)``: ``values`` ist ein Tupel mit
+    einem Wert je Spalte (1 .. ``max_col``), ``numeric`` markiert die gerundeten
+    Dichtungsmengen, ``odd`` die Zeilenparität für den Zebra-Hintergrund.
+    """
+    data = df.iloc[DF_DATA_START_ROW:]
+    n_rows = len(data)
+    empty = [None] * n_rows
+    no_num = [False] * n_rows
+
+    columns = {NUMBERING_COL: list(range(DF_DATA_START_ROW, len(df)))}
+    numeric = {}
+
+    # Hauptfelder
+    for col_idx, df_col in mainfield_by_col.items():
+        if df_col == "Zeitraum" and zeitraum is not None:
+            columns[col_idx] = zeitraum["display"].iloc[DF_DATA_START_ROW:].tolist()
+        elif df_col in df.columns:
+            columns[col_idx] = _text_column(data[df_col])
+        else:
+            columns[col_idx] = [""] * n_rows
+
+    # Dichtungswerte
+    for col_idx, name in dicht_by_col.items():
+        if name in df.columns:
+            columns[col_idx], numeric[col_idx] = _dicht_column(data[name])
+        else:
+            columns[col_idx], numeric[col_idx] = [""] * n_rows, no_num
+
+    value_cols = [columns.get(c, empty) for c in range(1, max_col + 1)]
+    numeric_cols = [numeric.get(c, no_num) for c in range(1, max_col + 1)]
+    odd = [row_num % 2 == 1 for row_num in range(DF_DATA_START_ROW, len(df))]
+    return zip(zip(*value_cols), odd, zip(*numeric_cols))
+
+
+# Style-Tabellen einer Arbeitsmappe, die der Streaming-Modus mit der Vorlage teilt
+_SHARED_STYLE_TABLES = (
+    "_fonts",
+    "_fills",
+    "_borders",
+    "_alignments",
+    "_protections",
+    "_number_formats",
+    "_cell_styles",
+    "_named_styles",
+    "_differential_styles",
+    "_table_styles",
+    "_colors",
+)
+
+# Blatt-Einstellungen, die der Streaming-Modus aus der Vorlage übernimmt
+_SHEET_SETTINGS = (
+    "sheet_properties",
+    "sheet_format",
+    "sheet_state",
+    "views",
+    "page_setup",
+    "print_options",
+    "page_margins",
+    "HeaderFooter",
+    "protection",
+    "conditional_formatting",
+    "data_validations",
+    "auto_filter",
+    "row_breaks",
+    "col_breaks",
+    "_print_area",
+    "_print_rows",
+    "_print_cols",
+)
+
+
+def save_streaming(wb, ws, output_path, row_writer, data_rows, n_data_rows, extra_row_idx):
+    """
+    Speichert die Packliste über eine write-only-Arbeitsmappe.
+
+    ``ws`` ist die vorbereitete Vorlage: Kopfzeilen, Spaltenbreiten, die erste
+    Datenzeile (in ``TEMPLATE_DATA_START_ROW``) und die Zusatzzeile
+    (in ``extra_row_idx``). Alle weiteren Datenzeilen kommen aus ``data_rows``
+    (Tupel ``(values, odd, numeric)``, siehe ``prepare_data_rows``) und werden direkt in die Datei
+    geschrieben, ohne im Speicher ein Arbeitsblatt aufzubauen.
+    Die write-only-Mappe teilt sich die Style-Tabellen mit ``wb``, die Stil-IDs
+    der Vorlage gelten dort also unverändert.
+    """
+    out_wb = Workbook(write_only=True)
+    for attr in _SHARED_STYLE_TABLES:
+        setattr(out_wb, attr, getattr(wb, attr))
+    for attr in ("loaded_theme", "properties", "security", "calculation", "views"):
+        setattr(out_wb, attr, getattr(wb, attr))
+
+    out_ws = out_wb.create_sheet(ws.title)
+    for attr in _SHEET_SETTINGS:
+        setattr(out_ws, attr, getattr(ws, attr))
+    for key, dim in ws.column_dimensions.items():
+        out_ws.column_dimensions[key] = copy(dim)
+    for cell_range in ws.merged_cells.ranges:
+        out_ws.merged_cells.add(cell_range.coord)
+
+    max_col = ws.max_column
+    written = 0
+
+    def append_template_row(src_row, dim_row=None):
+        nonlocal written
+        if dim_row is not None and dim_row in ws.row_dimensions:
+            out_ws.row_dimensions[written + 1] = copy(ws.row_dimensions[dim_row])
+        row = []
+        for col_idx in range(1, max_col + 1):
+            src = ws.cell(row=src_row, column=col_idx)
+            cell = WriteOnlyCell(out_ws, value=src.value)
+            cell._style = copy(_style_array(src))
+            row.append(cell)
+        out_ws.append(row)
+        written += 1
+
+    # Kopfzeilen
+    for row_idx in range(1, TEMPLATE_DATA_START_ROW):
+        append_template_row(row_idx, dim_row=row_idx)
+
+    # Datenzeilen: die erste liegt in der Vorlage, der Rest wird gestreamt
+    if n_data_rows:
+        append_template_row(TEMPLATE_DATA_START_ROW)
+    for values, odd, numeric in data_rows:
+        row_writer.stream_row(out_ws, values, odd, numeric)
+        written += 1
+
+    # Zusatzzeile
+    append_template_row(extra_row_idx)
+
+    # Zeilenhöhen der Vorlage unterhalb der Tabelle bleiben wie im normalen Modus erhalten
+    for row_idx in sorted(r for r in ws.row_dimensions if r > written):
+        while written < row_idx - 1:
+            out_ws.append([])
+            written += 1
+        out_ws.row_dimensions[row_idx] = copy(ws.row_dimensions[row_idx])
+        out_ws.append([])
+        written += 1
+
+    out_wb.save(output_path)
+
+
+def remove_trailing_blank_rows(ws, start_row):
+    """
+    Löscht am Tabellenende komplett leere Zeilen (unterhalb von ``start_row``).
+
+    Die letzte belegte Zeile wird von unten her gesucht, alles darunter wird
+    mit einem einzigen ``delete_rows`` entfernt.
+    """
+
+    def row_is_blank(r):
+        for col_idx in range(1, ws.max_column + 1):
+            val = ws.cell(row=r, column=col_idx).value
+            if val not in (None, ""):
+                return False
+        return True
+
+    last_used = ws.max_row
+    while last_used > start_row and row_is_blank(last_used):
+        last_used -= 1
+
+    if ws.max_row > last_used:
+        ws.delete_rows(last_used + 1, ws.max_row - last_used)
+
+
+# ------------------------------------------------------------
+# Dichtungs-Namen umbrechen & Spaltenbreiten
+# ------------------------------------------------------------
+
+def apply_dicht_name_break(name: str) -> str:
+    """
+    Versucht, Dichtungsnamen sinnvoll in max. 2 Zeilen umzubrechen.
+
+    - Wenn '_' vorhanden: Umbruch dort (z.B. '10/5_S' -> '10/5\nS').
+    - Sonst, wenn Leerzeichen vorhanden: Umbruch zwischen Wörtern
+      (z.B. 'Omega klebend' -> 'Omega\nklebend').
+    - Sonst: String ungefähr in der Mitte trennen.
+    """
+    if not name:
+        return ""
+    name = str(name).strip()
+
+    if "_" in name:
+        left, right = name.split("_", 1)
+        return left + "\n" + right
+
+    parts = name.split()
+    if len(parts) == 1:
+        if len(name) <= 8:
+            return name
+        half = math.ceil(len(name) / 2)
+        return name[:half] + "\n" + name[half:]
+    else:
+        if len(parts) == 2:
+            return parts[0] + "\n" + parts[1]
+        mid = math.ceil(len(parts) / 2)
+        line1 = " ".join(parts[:mid])
+        line2 = " ".join(parts[mid:])
+        return line1 + "\n" + line2
+
+
+def adjust_dichtung_column_widths(ws, dicht_col_map, max_width=12, min_width=6):
+    """
+    Setzt die Spaltenbreite der Dichtungs-Spalten so klein wie möglich,
+    ohne dass die Überschrift unsinnig oft umbrechen muss.
+    Orientiert sich an der Länge der längeren Zeile der Überschrift.
+    """
+    for name, col_idx in dicht_col_map.items():
+        header_cell = ws.cell(row=TEMPLATE_DICHTUNG_NAME_ROW, column=col_idx)
+        txt = str(header_cell.value) if header_cell.value is not None else ""
+        lines = txt.split("\n")
+        max_len = max((len(line) for line in lines), default=0)
+        width = max(min_width, min(max_width, max_len + 2))
+        col_letter = get_column_letter(col_idx)
+        ws.column_dimensions[col_letter].width = width
+
+
+# ------------------------------------------------------------
+# Template-Cache
+# ------------------------------------------------------------
+
+# Prozessweiter Cache der vorbereiteten Vorlage: die Vorlage wird nur einmal
+# geparst (bzw. nach einer Änderung der Datei erneut) und als Pickle-Snapshot
+# gehalten. Jede Konvertierung bekommt daraus eine frische In-Memory-Kopie.
+_template_cache = {"path": None, "mtime": None, "snapshot": None, "info": None, "digest": None}
+_template_lock = threading.Lock()
+
+
+def _build_template_snapshot(template_path):
+    wb = load_workbook(template_path)
+    ws = wb.active
+    info = {
+        "width_info": ws.column_dimensions["F"].width,
+        "width_ersatz": ws.column_dimensions["G"].width,
+    }
+    ws.delete_rows(1)  # erste Zeile im Template entfernen
+    return pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL), info
+
+
+def _restore_template_snapshot(snapshot):
+    """
+    Entpickelt einen Template-Snapshot. Die Spalten-/Zeilen-Dimensionen von
+    openpyxl (``DimensionHolder``) verlieren beim Pickeln ihre Bindung an das
+    Arbeitsblatt und werden hier wieder verknüpft.
+    """
+    wb = pickle.loads(snapshot)
+    for ws in wb.worksheets:
+        for holder, factory in (
+            (ws.column_dimensions, ws._add_column),
+            (ws.row_dimensions, ws._add_row),
+        ):
+            holder.worksheet = ws
+            holder.reference = "index"
+            holder.default_factory = factory
+    return wb
+
+
+def _current_template():
+    """
+    Liefert ``(snapshot, info, digest)`` der aktuellen Vorlage und baut den
+    Snapshot neu, wenn sich Pfad oder mtime geändert haben.
+    """
+    template_path = resource_path(TEMPLATE_FILE)
+    try:
+        mtime = os.stat(template_path).st_mtime_ns
+    except OSError:
+        raise FileNotFoundError(f"Template-Datei '{TEMPLATE_FILE}' wurde nicht gefunden.") from None
+
+    with _template_lock:
+        cache = _template_cache
+        if cache["path"] != template_path or cache["mtime"] != mtime:
+            snapshot, info = _build_template_snapshot(template_path)
+            digest = hashlib.sha256(Path(template_path).read_bytes()).hexdigest()
+            cache.update(path=template_path, mtime=mtime, snapshot=snapshot, info=info, digest=digest)
+        return cache["snapshot"], cache["info"], cache["digest"]
+
+
+def load_template():
+    """
+    Liefert ``(wb, info)``: eine frische Kopie der vorbereiteten Vorlage
+    (erste Zeile bereits entfernt) und die Original-Spaltenbreiten von F/G.
+
+    Die Vorlage wird nur neu geparst, wenn sich Pfad oder mtime geändert haben.
+    """
+    snapshot, info, _ = _current_template()
+    return _restore_template_snapshot(snapshot), dict(info)
+
+
+def template_fingerprint():
+    """SHA-256 der aktuellen Vorlagendatei (wird mit dem Snapshot gecacht)."""
+    return _current_template()[2]
+
+
+# ------------------------------------------------------------
+# Laden / Speichern der Dichtungen
+# ------------------------------------------------------------
+
+# Der Dichtungs-Katalog wird einmal geladen, normalisiert und vorsortiert und
+# erst nach einer Änderung der Datei (mtime) bzw. nach ``save_dichtungen`` neu gelesen.
+_dichtungen_cache = {
+    "path": None, "mtime": None, "items": None, "records": None, "sorted": None, "digest": None
+}
+_dichtungen_lock = threading.Lock()
+
+
+def _normalize_dichtungen(data):
+    """
+    Bringt die JSON-Einträge in die Form ``{"name", "always_show", "default_value", "order"}``.
+    Reine Strings werden zu Einträgen ergänzt, Einträge ohne Namen verworfen.
+    """
+    if not isinstance(data, list):
+        print("Fehler beim Laden der Dichtungen: Liste erwartet, nicht", type(data).__name__)
+        return []
+    normalized = []
+    for item in data:
+        if isinstance(item, dict):
+            entry = {"name": "", "always_show": False, "default_value": 0, "order": "", **item}
+        else:
+            entry = {"name": item, "always_show": False, "default_value": 0, "order": ""}
+        if not isinstance(entry["name"], str) or not entry["name"].strip():
+            print("Dichtung ohne Namen wird ignoriert:", item)
+            continue
+        normalized.append(entry)
+    return normalized
+
+
 def save_dichtungen(dichtungen_list) -> bool:
     """
     Speichert die Dichtungen im JSON-Format.
@@ -421,369 +1081,1452 @@ def save_dichtungen(dichtungen_list) -> bool:
         with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(dichtungen_list, f, ensure_ascii=False, indent=2)
         tmp_path.replace(path)
-        return True
     except Exception as e:
         print("Fehler beim Speichern der Dichtungen:", e)
         return False
-
-
-def load_dichtungen():
-    """
-    Lädt die Dichtungen aus 'dichtungen.json'.
-    Falls die Datei fehlt oder fehlerhaft ist, wird eine leere Liste zurückgegeben.
-    """
+    finally:
+        # Beim nächsten Zugriff neu laden (auch wenn die mtime-Auflösung grob ist)
+        with _dichtungen_lock:
+            _dichtungen_cache["mtime"] = None
+    return True
+
+
+def load_dichtungen():
+    """
+    Lädt die Dichtungen aus 'dichtungen.json'.
+    Falls die Datei fehlt oder fehlerhaft ist, wird eine leere Liste zurückgegeben.
+
+    Die Liste wird gecacht und nur neu gelesen, wenn sich die Datei geändert hat;
+    sie darf deshalb nicht verändert werden.
+    """
     path = resource_path(DICHTUNGEN_CONFIG)
-    if not os.path.exists(path):
-        return DEFAULT_DICHTUNGEN.copy()
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print("Fehler beim Laden der Dichtungen:", e)
-        return DEFAULT_DICHTUNGEN.copy()
-    normalized = []
-    for item in data:
-        if isinstance(item, dict):
-            normalized.append(item)
-        else:
-            normalized.append(
-                {"name": item, "always_show": False, "default_value": 0, "order": ""}
-            )
-    return normalized
-
-
-def guess_dichtungen_from_df(df):
-    """
-    Fallback: Wenn keine Dichtungen aus JSON kommen,
-    nehmen wir alle Spalten außer den bekannten Feldern, die nicht komplett leer sind.
-    """
-    known = {
-        "Service Techniker",
-        "Zeitraum",
-        "Dealname",
-        "Weitere Techniker",
-        "Informationen Packliste",
-        "Ersatzteil und Zubehör",
-    }
-    candidates = []
-    for col in df.columns:
-        if col in known:
-            continue
-        if spalte_leer(df, col):
-            continue
-        candidates.append({
-            "name": col,
-            "always_show": True,
-            "default_value": 0,
-            "order": ""
-        })
-    return candidates
-
-
-# ------------------------------------------------------------
-# Hauptfunktion: Konvertierung
-# ------------------------------------------------------------
-
-def convert_file(input_path, output_path, user_dichtungen=None, show_message=False):
-    """
-    Konvertiert die Export-Datei (Excel/CSV) in die Packlisten-Vorlage.
-    """
-    # 1) Template einlesen
-    template_path = resource_path(TEMPLATE_FILE)
-    if not os.path.isfile(template_path):
-        raise FileNotFoundError(f"Template-Datei '{TEMPLATE_FILE}' wurde nicht gefunden.")
-    template_orig_wb = load_workbook(template_path)
-    template_orig_ws = template_orig_wb.active
-    original_width_info = template_orig_ws.column_dimensions["F"].width
-    original_width_ersatz = template_orig_ws.column_dimensions["G"].width
-
-    # 2) Eingabedatei in DataFrame laden
-    ext = os.path.splitext(input_path)[1].lower()
-    if ext == ".csv":
-        df = pd.read_csv(input_path, sep=";", engine="python", header=0)
-    else:
-        df = pd.read_excel(input_path, header=0)
-
-    # 3) Datensätze nach Datum/Uhrzeit sortieren (Zeile 0 bleibt Summenzeile)
-    try:
-        sum_row = df.iloc[[0]].copy()
-        data_rows = df.iloc[1:].copy()
-        if "Zeitraum" in data_rows.columns:
-
-            def parse_datetime(x):
-                pattern = r'^(\d{1,2}\.\d{1,2}\.\d{4})\s+(\d{1,2}:\d{1,2})'
-                m = re.match(pattern, str(x))
-                if m:
-                    dt_str = f"{m.group(1)} {m.group(2)}"
-                    return pd.to_datetime(dt_str, format="%d.%m.%Y %H:%M", errors="coerce")
-                m2 = re.match(r'^(\d{1,2}\.\d{1,2}\.\d{4})', str(x))
-                if m2:
-                    return pd.to_datetime(m2.group(1), dayfirst=True, errors="coerce")
-                return pd.NaT
-
-            data_rows["ParsedDateTime"] = data_rows["Zeitraum"].apply(parse_datetime)
-            data_rows.sort_values(by="ParsedDateTime", ascending=True, inplace=True)
-            df = pd.concat([sum_row, data_rows], ignore_index=True)
-            df.drop(columns=["ParsedDateTime"], inplace=True, errors="ignore")
-    except Exception as e:
-        print("Fehler beim Sortieren nach Datum/Uhrzeit:", e)
-
-    # 4) Dichtungen laden bzw. erraten
-    if user_dichtungen is None:
-        user_dichtungen = load_dichtungen()
-    if not user_dichtungen:
-        user_dichtungen = guess_dichtungen_from_df(df)
-
-    def has_effective_dichtungen(dichtungen):
-        for d in dichtungen:
-            name = d.get("name")
-            if not name:
-                continue
-            if str(name).strip().lower() == "tag":
-                continue
-            is_standard = d.get("always_show", False)
-            if is_standard:
-                return True
-            if name in df.columns and not spalte_leer(df, name):
-                return True
-        return False
-
-    if not has_effective_dichtungen(user_dichtungen):
-        user_dichtungen = guess_dichtungen_from_df(df)
-
-    # 5) Template-Kopie erzeugen
-    temp_copy_path = output_path + "_temp_template.xlsx"
-    shutil.copyfile(template_path, temp_copy_path)
-
-    wb = load_workbook(temp_copy_path)
-    ws = wb.active
-    ws.delete_rows(1)  # erste Zeile im Template entfernen
-
-    # 6) Dichtungen sortieren
-    final_dichtungen = final_sort_dichtungen(user_dichtungen, df)
-
-    # 7) Kopfbereich (Technikername & Zeitraum)
-    serv_val = safe_val(df, "Service Techniker", 3)
-    ws.cell(row=SERVICE_TECHNIKER_ROW, column=2, value=serv_val).font = Font(
-        name="Calibri", size=14, bold=True
-    )
-    zr = get_zeitraum_von_bis(df, "Zeitraum")
-    ws.cell(row=DATE_ROW, column=2, value=zr).font = Font(
-        name="Calibri", size=14, bold=True
-    )
-
-    # 8) Mapping Eingabespalten -> Template-Spalten
-    global_mainfield = [
-        ("Zeitraum", 2),                # B
-        ("Dealname", 3),                # C
-        ("Weitere Techniker", 4),       # D
-        ("Informationen Packliste", 6), # F
-        ("Ersatzteil und Zubehör", 7),  # G
-    ]
-
-    # 9) Dichtungs-Spalten ab PLATZHALTER_COL_INDEX (E)
-    current_col = PLATZHALTER_COL_INDEX
-    first_run = True
-    dicht_col_map = {}
-
-    for dicht in final_dichtungen:
-        name = dicht.get("name")
-        if not name:
-            continue
-        # "Tag" nicht als Dichtung anzeigen
-        if str(name).strip().lower() == "tag":
-            continue
-        is_standard = dicht.get("always_show", False)
-        # Nicht-Standard-Dichtungen nur anzeigen, wenn Werte vorhanden
-        if (not is_standard) and spalte_leer(df, name):
-            continue
-
-        if first_run:
-            used_col = current_col
-            first_run = False
-        else:
-            new_col = current_col + 1
-            ws.insert_cols(new_col)
-            copy_column_with_style(ws, PLATZHALTER_COL_INDEX, new_col)
-            # Mapping rechts verschieben
-            for i, (dfcol, cidx) in enumerate(global_mainfield):
-                if cidx >= new_col:
-                    global_mainfield[i] = (dfcol, cidx + 1)
-            used_col = new_col
-            current_col = new_col
-
-        # linke Rahmenlinie
-        set_column_left_border(ws, used_col, start_row=1, border_style="thin")
-
-        # Überschrift mit sinnvollem Zeilenumbruch
-        mod_name = apply_dicht_name_break(name)
-        head_cell = ws.cell(row=TEMPLATE_DICHTUNG_NAME_ROW, column=used_col, value=mod_name)
-        head_cell.font = Font(name="Calibri", size=12, bold=True)
-        head_cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-        # Summen-Zeile
-        sum_val_raw = safe_val(df, name, DF_SUM_ROW)
-        sum_num = parse_number(sum_val_raw)
-        sum_cell = ws.cell(row=TEMPLATE_SUM_ROW, column=used_col, value=round(sum_num))
-        sum_cell.number_format = "0"
-        sum_cell.font = Font(name="Calibri", size=16, color="FF0000")
-        sum_cell.alignment = Alignment(horizontal="center", vertical="top", wrap_text=True)
-
-        dicht_col_map[name] = used_col
-
-    # Linie unter den Dichtungsnamen
-    set_bottom_solid(ws, TEMPLATE_DICHTUNG_NAME_ROW)
-
-    # 10) Datenzeilen übertragen
-    t_row = TEMPLATE_DATA_START_ROW
-    for df_row in range(DF_DATA_START_ROW, len(df)):
-        if t_row > ws.max_row:
-            ws.insert_rows(idx=t_row)
-        copy_entire_row_format(ws, TEMPLATE_DATA_START_ROW, t_row)
-
-        row_num = df_row
-        num_cell = ws.cell(row=t_row, column=NUMBERING_COL, value=row_num)
-        num_cell.font = Font(name="Calibri", size=12, bold=True)
-        num_cell.alignment = Alignment(horizontal="right", vertical="top", wrap_text=True)
-
-        # Hauptfelder
-        for (df_col, tmplt_col) in global_mainfield:
-            val = safe_val(df, df_col, df_row)
-            cell = ws.cell(row=t_row, column=tmplt_col)
-            if df_col == "Zeitraum":
-                val = transform_zeitraum(val)
-                cell.value = val
-                cell.font = Font(name="Calibri", size=12, bold=True)
-            else:
-                cell.value = val
-                if df_col in ["Informationen Packliste", "Ersatzteil und Zubehör", "Weitere Techniker"]:
-                    cell.font = Font(bold=True, color="FF0000")
-                else:
-                    cell.font = Font(name="Calibri", size=12, bold=False, color="000000")
-            cell.alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
-
-        # Dichtungswerte
-        for dicht in final_dichtungen:
-            name = dicht.get("name")
-            if not name:
-                continue
-            if str(name).strip().lower() == "tag":
-                continue
-            is_standard = dicht.get("always_show", False)
-            if (not is_standard) and spalte_leer(df, name):
-                continue
-            col_idx = dicht_col_map.get(name)
-            if col_idx is None:
-                continue
-            raw_val = df[name].iloc[df_row] if name in df.columns else ""
-            cell = ws.cell(row=t_row, column=col_idx)
-            try:
-                num_val = float(raw_val)
-                cell.value = round(num_val)
-                cell.number_format = "0"
-            except Exception:
-                cell.value = raw_val
-            cell.alignment = Alignment(horizontal="center", vertical="top", wrap_text=True)
-            cell.font = Font(name="Calibri", size=12, bold=False)
-
-        # Linien & Zebra
-        if t_row == TEMPLATE_DATA_START_ROW:
-            set_top_border_solid(ws, t_row)
-            set_horizontal_dotted(ws, t_row)
-        else:
-            set_horizontal_dotted(ws, t_row)
-
-        bg_color = "DDDDDD" if (row_num % 2 == 1) else "FFFFFF"
-        for col_idx in range(1, ws.max_column + 1):
-            ws.cell(row=t_row, column=col_idx).fill = PatternFill("solid", fgColor=bg_color)
-
-        t_row += 1
-
-    # 11) Zusätzliche-Dichtungen-Zeile
-    extra_line_row = t_row
-    ws.insert_rows(idx=extra_line_row)
-    copy_entire_row_format(ws, TEMPLATE_DATA_START_ROW, extra_line_row)
-    set_top_border_solid(ws, extra_line_row)
-    set_bottom_thick(ws, extra_line_row)
-
-    extra_text_cell = ws.cell(row=extra_line_row, column=3, value="zusätzliche Dichtungen")
-    extra_text_cell.font = Font(bold=True)
-    extra_text_cell.alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
-
-    last_used_df_row = len(df)
-    bg_color = "DDDDDD" if (last_used_df_row % 2 == 1) else "FFFFFF"
-    for col_idx in range(1, ws.max_column + 1):
-        ws.cell(row=extra_line_row, column=col_idx).fill = PatternFill("solid", fgColor=bg_color)
-
-    # 12) Standard-Dichtungen in der zusätzlichen Zeile vorbelegen
-    for dicht in final_dichtungen:
-        if not dicht.get("always_show", False):
-            continue
-        name = dicht.get("name")
-        if not name or name not in dicht_col_map:
-            continue
-        col_idx = dicht_col_map[name]
-        fix_value = dicht.get("default_value", 0)
-        try:
-            fix_value_num = float(fix_value)
-        except Exception:
-            fix_value_num = 0.0
-        c = ws.cell(row=extra_line_row, column=col_idx, value=fix_value_num)
-        c.number_format = "0"
-        c.alignment = Alignment(horizontal="center", vertical="top", wrap_text=True)
-        c.font = Font(name="Calibri", size=12, bold=False)
-
-        old_sum = ws.cell(row=TEMPLATE_SUM_ROW, column=col_idx).value
-        old_sum = old_sum if isinstance(old_sum, (int, float)) else 0
-        new_sum = old_sum + fix_value_num
-        s_cell = ws.cell(row=TEMPLATE_SUM_ROW, column=col_idx, value=new_sum)
-        s_cell.number_format = "0"
-        s_cell.font = Font(name="Calibri", size=16, bold=False, color="FF0000")
-        s_cell.alignment = Alignment(horizontal="center", vertical="top", wrap_text=True)
-
-    # 13) Info/Ersatzteil-Spaltenbreite aus Template übernehmen
-    for field, orig_width in [
-        ("Informationen Packliste", original_width_info),
-        ("Ersatzteil und Zubehör", original_width_ersatz),
-    ]:
-        col_idx = next((col for df_field, col in global_mainfield if df_field == field), None)
-        if col_idx is not None and orig_width:
-            col_letter = get_column_letter(col_idx)
-            ws.column_dimensions[col_letter].width = orig_width
-
-    # 14) Bestimmte Spalten ausblenden, wenn sie komplett leer sind
-    for field in ["Weitere Techniker", "Informationen Packliste", "Ersatzteil und Zubehör"]:
-        col_idx = next((col for (df_field, col) in global_mainfield if df_field == field), None)
-        if col_idx is None:
-            continue
-        col_letter = get_column_letter(col_idx)
-        if spalte_leer(df, field):
-            ws.column_dimensions[col_letter].hidden = True
-        else:
-            ws.column_dimensions[col_letter].hidden = False
-
-    # 15) Leere Zeilen am Ende entfernen
-    remove_trailing_blank_rows(ws, extra_line_row)
-
-    # 16) Schriftfarbe der Dichtungs-Spalten alternierend blau/schwarz
-    BLUE_COLOR = "0000FF"
-    BLACK_COLOR = "000000"
-    dicht_spalten_sorted = sorted(dicht_col_map.values())
-    for i, col_idx in enumerate(dicht_spalten_sorted):
-        font_color = BLUE_COLOR if i % 2 == 0 else BLACK_COLOR
-        for row_idx in range(1, ws.max_row + 1):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            new_font = copy(cell.font)
-            new_font.color = font_color
-            cell.font = new_font
-
-    # 17) Dichtungs-Spaltenbreiten anpassen
-    adjust_dichtung_column_widths(ws, dicht_col_map)
-
-    # 18) Speichern
-    wb.save(output_path)
-    wb.close()
-    if os.path.exists(temp_copy_path):
-        os.remove(temp_copy_path)
-
-    return output_path
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return DEFAULT_DICHTUNGEN.copy()
+
+    with _dichtungen_lock:
+        cache = _dichtungen_cache
+        if cache["path"] == path and cache["mtime"] == mtime:
+            return cache["items"]
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print("Fehler beim Laden der Dichtungen:", e)
+        return DEFAULT_DICHTUNGEN.copy()
+
+    items = _normalize_dichtungen(data)
+    records = [Dichtung.from_dict(d) for d in items]
+    digest = hashlib.sha256(
+        json.dumps(items, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    with _dichtungen_lock:
+        _dichtungen_cache.update(
+            path=path,
+            mtime=mtime,
+            items=items,
+            records=records,
+            sorted=sorted(records, key=lambda d: d.sort_key),
+            digest=digest,
+        )
+    return items
+
+
+def dichtungen_digest(dichtungen):
+    """SHA-256 einer Dichtungsliste; für die gecachte Liste ohne erneutes Serialisieren."""
+    with _dichtungen_lock:
+        if dichtungen is _dichtungen_cache["items"]:
+            return _dichtungen_cache["digest"]
+    return hashlib.sha256(
+        json.dumps(dichtungen, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def guess_dichtungen_from_df(df, empty_mask=None):
+    """
+    Fallback: Wenn keine Dichtungen aus JSON kommen,
+    nehmen wir alle Spalten außer den bekannten Feldern, die nicht komplett leer sind.
+    ``empty_mask`` ist das Ergebnis von ``empty_column_mask`` (wird sonst berechnet).
+    """
+    if empty_mask is None:
+        empty_mask = empty_column_mask(df)
+    known = set(MAIN_FIELDS)
+    candidates = []
+    for col in df.columns:
+        if col in known:
+            continue
+        if empty_mask.get(col, True):
+            continue
+        candidates.append({
+            "name": col,
+            "always_show": True,
+            "default_value": 0,
+            "order": ""
+        })
+    return candidates
+
+
+# ------------------------------------------------------------
+# Laufzeitmessung pro Konvertierungsschritt
+# ------------------------------------------------------------
+
+class StageTimer:
+    """
+    Misst Laufzeit und Spitzen-Speicher der einzelnen Konvertierungsschritte.
+
+    ``lap(name)`` beendet den laufenden Abschnitt und startet den nächsten,
+    ``stop()`` beendet den letzten. Mit ``track_memory=True`` wird pro Abschnitt
+    der Spitzenwert von ``tracemalloc`` erfasst (kostet deutlich Laufzeit und ist
+    prozessweit – bei parallelen Konvertierungen nur ein Richtwert).
+    Ein Timer mit ``enabled=False`` tut nichts.
+    """
+
+    def __init__(self, enabled=True, track_memory=False):
+        self.enabled = enabled
+        self.track_memory = track_memory and enabled
+        self.stages = []
+        self._current = None
+        self._started = None
+        self._own_tracing = False
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        self._close()
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._own_tracing = True
+            tracemalloc.reset_peak()
+        self._current = name
+        self._started = time.perf_counter()
+
+    def _close(self):
+        if self._current is None:
+            return
+        entry = {"stage": self._current, "ms": round((time.perf_counter() - self._started) * 1000, 1)}
+        if self.track_memory:
+            entry["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024)
+        self.stages.append(entry)
+        self._current = None
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._close()
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+
+    def report(self):
+        return {
+            "stages": list(self.stages),
+            "total_ms": round(sum(e["ms"] for e in self.stages), 1),
+        }
+
+    def header_value(self):
+        """Kompakte Form für einen HTTP-Header, z. B. ``template=3.1;rows=120.4;total=150.2``."""
+        parts = [f"{e['stage']}={e['ms']}" for e in self.stages]
+        parts.append(f"total={self.report()['total_ms']}")
+        return ";".join(parts)
+
+    def log(self, **context):
+        # strukturiert als eine JSON-Zeile
+        print(json.dumps({"event": "packliste_timing", **context, **self.report()}, ensure_ascii=False))
+
+
+_NO_TIMER = StageTimer(enabled=False)
+
+
+# ------------------------------------------------------------
+# Ergebnis-Cache für wiederholte Konvertierungen
+# ------------------------------------------------------------
+
+class ResultCache:
+    """
+    LRU-Cache für fertige Packlisten im Speicher, begrenzt auf ``max_bytes``.
+
+    Schlüssel ist ein Hash aus Eingabedatei, effektiven Dichtungen und Vorlage
+    (siehe ``result_cache_key``); Werte sind ``(xlsx_bytes, auto_stem)``.
+    Treffer und Fehlzugriffe werden mitgezählt (``stats()``).
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, xlsx, auto_stem):
+        size = len(xlsx)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (xlsx, auto_stem)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+result_cache = ResultCache()
+
+
+def result_cache_key(data, filename, user_dichtungen):
+    """
+    Hash aus Eingabe-Bytes, Dateiendung (CSV/Excel), den effektiven Dichtungen
+    und der Vorlagendatei.
+    """
+    h = hashlib.sha256()
+    h.update(data)
+    h.update(os.path.splitext(str(filename))[1].lower().encode("utf-8"))
+    h.update(dichtungen_digest(user_dichtungen).encode("ascii"))
+    h.update(template_fingerprint().encode("ascii"))
+    return h.hexdigest()
+
+
+# ------------------------------------------------------------
+# Hauptfunktion: Konvertierung
+# ------------------------------------------------------------
+
+def _excel_cell_value(value):
+    # wie pandas' openpyxl-Reader: leer -> "", ganzzahlige Floats -> int
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _read_excel_columns(source, columns):
+    """
+    Liest aus der ersten Tabelle einer .xlsx nur die Spalten, deren Überschrift in
+    ``columns`` steht (read-only, Zeile für Zeile). Typ-Erkennung und leere
+    Zeilen/Zellen werden wie bei ``pd.read_excel`` behandelt, das Ergebnis ist für
+    die ausgewählten Spalten identisch.
+
+    Gibt ``None`` zurück, wenn die Tabelle leer ist (dann normal einlesen).
+    """
+    wb = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return None
+        keep = [i for i, v in enumerate(header) if _excel_cell_value(v) in columns]
+
+        def project(row):
+            return [_excel_cell_value(row[i]) if i < len(row) else "" for i in keep]
+
+        data = [project(header)]
+        last_with_data = 0 if any(v not in (None, "") for v in header) else -1
+        for row in rows:
+            data.append(project(row))
+            # leere Zeilen am Ende zählen wie bei pandas über die ganze Zeile
+            if any(v not in (None, "") for v in row):
+                last_with_data = len(data) - 1
+    finally:
+        wb.close()
+
+    data = data[: last_with_data + 1]
+    if not data:
+        return None
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+# Dezimalkomma in Mengenangaben, z. B. "1,5" oder "-2,25"
+_DECIMAL_COMMA_RE = r"\s*-?\d+,\d+\s*"
+
+
+def _decimal_comma_to_float(df):
+    """
+    Wandelt Werte mit Dezimalkomma in den Dichtungsspalten (alle Spalten außer
+    den Hauptfeldern) in Zahlen um; andere Texte bleiben unverändert.
+    """
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in MAIN_FIELDS or not (dtype == object or isinstance(dtype, pd.StringDtype)):
+            continue
+        text = df[col].where(df[col].map(type) == str)
+        mask = text.str.fullmatch(_DECIMAL_COMMA_RE).fillna(False).astype(bool)
+        if mask.any():
+            df[col] = df[col].astype(object)
+            df.loc[mask, col] = text[mask].str.replace(",", ".", regex=False).astype(float)
+    return df
+
+
+def _read_csv(source, columns=None):
+    """
+    Liest einen CSV-Export (Trennzeichen ';') mit dem schnellen C-Parser.
+    Die Hauptfelder werden als Text gelesen, ``columns`` schränkt die Spalten ein.
+    Scheitert der C-Parser (z. B. an unregelmäßigen Zeilen), wird mit dem
+    Python-Parser erneut gelesen.
+    """
+    if hasattr(source, "read"):
+        # für einen zweiten Versuch muss die Quelle erneut lesbar sein
+        source = BytesIO(source.read())
+    options = {
+        "sep": ";",
+        "header": 0,
+        "dtype": {field: str for field in MAIN_FIELDS},
+    }
+    if columns is not None:
+        options["usecols"] = lambda c: c in columns
+
+    try:
+        df = pd.read_csv(source, engine="c", **options)
+    except Exception as e:
+        print("CSV-Schnellpfad fehlgeschlagen, lese mit Python-Parser:", e)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        df = pd.read_csv(source, engine="python", **options)
+    return _decimal_comma_to_float(df)
+
+
+def read_input_file(input_path, filename=None, columns=None):
+    """
+    Liest die Export-Datei (Excel/CSV, oder Deal-Datensätze als JSON, siehe
+    ``records_to_dataframe``) in einen DataFrame ein.
+
+    ``input_path`` darf auch ein dateiähnliches Objekt (z. B. ein Upload-Stream)
+    sein; das Format wird dann über ``filename`` bestimmt.
+    Mit ``columns`` werden nur diese Spalten geladen (Zoho-Exporte enthalten
+    viele Spalten, die die Packliste nicht braucht).
+    """
+    ext = os.path.splitext(str(filename or input_path))[1].lower()
+    if ext == ".csv":
+        return _read_csv(input_path, set(columns) if columns is not None else None)
+    if ext == ".json":
+        source = input_path.read() if hasattr(input_path, "read") else Path(input_path).read_bytes()
+        df = records_to_dataframe(json.loads(source))
+        return df if columns is None else df[[col for col in df.columns if col in columns]]
+    if columns is not None and ext in (".xlsx", ".xlsm"):
+        df = _read_excel_columns(input_path, set(columns))
+        if df is not None:
+            return df
+        if hasattr(input_path, "seek"):
+            input_path.seek(0)
+    return pd.read_excel(input_path, header=0)
+
+
+def read_export(input_path, user_dichtungen, filename=None):
+    """
+    Liest einen Export mit den Spalten, die die Konvertierung tatsächlich braucht:
+    Hauptfelder plus konfigurierte Dichtungen.
+
+    Müssen die Dichtungen aus den Spalten erraten werden (keine Konfiguration bzw.
+    keine davon sichtbar), wird die Datei vollständig eingelesen.
+    """
+    dichtungen = as_dichtungen(user_dichtungen)
+    if dichtungen:
+        columns = set(MAIN_FIELDS) | {d.name for d in dichtungen}
+        df = read_input_file(input_path, filename, columns=columns)
+        if select_visible_dichtungen(dichtungen, df):
+            return df
+        if hasattr(input_path, "seek"):
+            input_path.seek(0)
+    return read_input_file(input_path, filename)
+
+
+def _record_value(value):
+    # Zoho-API-Felder: Lookups als {"name": ..., "id": ...}, Mehrfachauswahl als Liste
+    if isinstance(value, dict):
+        return value.get("name")
+    if isinstance(value, list):
+        return ", ".join(str(_record_value(v)) for v in value if v is not None)
+    return value
+
+
+def records_to_dataframe(records):
+    """
+    Baut aus Deal-Datensätzen einen Export-DataFrame, wie ihn ``read_input_file``
+    für eine Export-Datei liefert: eine Zeile je Datensatz, davor die Summenzeile
+    (aus den Datensätzen berechnet, siehe ``_group_sum_row``).
+
+    ``records`` ist eine (nicht leere) Liste von Objekten mit denselben Feldnamen
+    wie die Spalten des Exports, oder eine Zoho-API-Antwort der Form ``{"data": [...]}``.
+    Lookup-Felder (``{"name": ..., "id": ...}``) werden zu ihrem Namen,
+    Mehrfachauswahlen zu einer kommagetrennten Liste.
+    """
+    if isinstance(records, dict):
+        records = records.get("data")
+    if not records or not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError("Deal-Datensätze: nicht leere Liste von Objekten bzw. {\"data\": [...]} erwartet")
+
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    data = pd.DataFrame(
+        [{key: _record_value(value) for key, value in record.items()} for record in records],
+        columns=columns,
+    )
+    data = _decimal_comma_to_float(data)
+    return pd.concat([_group_sum_row(data), data], ignore_index=True)
+
+
+def auto_stem_from_df(df, zeitraum=None):
+    """
+    Erzeugt aus Service Techniker + Zeitraum einen Dateinamen-Stamm wie
+    'DanielOberrauner_24112025-28112025'.
+    Gibt None zurück, wenn keine der beiden Angaben vorhanden ist.
+    """
+    serv = technician_name(df)
+    date_range = get_zeitraum_von_bis(df, "Zeitraum", zeitraum)
+
+    if not serv and not date_range:
+        return None
+
+    def sanitize(text: str) -> str:
+        # nur Buchstaben, Zahlen, Unterstrich und Minus
+        return "".join(c for c in text if c.isalnum() or c in ("_", "-"))
+
+    serv_sanitized = sanitize(serv) or "Packliste"
+    date_sanitized = sanitize(date_range.replace(" ", "")) if date_range else ""
+
+    if date_sanitized:
+        stem = f"{serv_sanitized}_{date_sanitized}"
+    else:
+        stem = serv_sanitized
+
+    return stem or None
+
+
+def convert_file(input_path, output_path, user_dichtungen=None, show_message=False, streaming=False,
+                 profile=False):
+    """
+    Konvertiert die Export-Datei (Excel/CSV) in die Packlisten-Vorlage.
+
+    Mit ``profile=True`` werden Laufzeit und Spitzen-Speicher je Schritt gemessen,
+    protokolliert und als ``(output_path, report)`` zurückgegeben (siehe ``StageTimer``).
+    """
+    timer = StageTimer(track_memory=True) if profile else _NO_TIMER
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+    timer.lap("parse")
+    df = read_export(input_path, user_dichtungen)
+    convert_dataframe(df, output_path, user_dichtungen, streaming=streaming, timer=timer)
+    if profile:
+        timer.log(input=str(input_path), rows=len(df))
+        return output_path, timer.report()
+    return output_path
+
+
+def convert_stream(input_stream, filename, user_dichtungen=None, streaming=False, timer=None):
+    """
+    Konvertiert eine Export-Datei aus einem dateiähnlichen Objekt, ohne
+    temporäre Dateien anzulegen. ``filename`` bestimmt das Eingabeformat.
+
+    Rückgabe: ``(BytesIO, auto_stem)`` – der Puffer steht auf Position 0.
+    """
+    timer = timer or _NO_TIMER
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+    timer.lap("parse")
+    df = read_export(input_stream, user_dichtungen, filename)
+    output = BytesIO()
+    _, auto_stem = convert_dataframe(df, output, user_dichtungen, streaming=streaming, timer=timer)
+    output.seek(0)
+    return output, auto_stem
+
+
+def convert_bytes(data, filename, user_dichtungen=None, streaming=False, use_cache=True, timer=None):
+    """
+    Wie ``convert_stream``, nur mit Bytes als Ein- und Ausgabe.
+
+    Identische Anfragen (gleiche Datei, Dichtungen und Vorlage) werden aus
+    ``result_cache`` beantwortet, ohne erneut zu konvertieren; ein übergebener
+    ``timer`` enthält dann nur den Abschnitt ``cache``.
+
+    Rückgabe: ``(bytes, auto_stem)``.
+    """
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+
+    timer = timer or _NO_TIMER
+    timer.lap("cache")
+    key = result_cache_key(data, filename, user_dichtungen) if use_cache else None
+    if key is not None:
+        cached = result_cache.get(key)
+        if cached is not None:
+            timer.stop()
+            return cached
+
+    output, auto_stem = convert_stream(BytesIO(data), filename, user_dichtungen, streaming=streaming, timer=timer)
+    xlsx = output.getvalue()
+    if key is not None:
+        result_cache.put(key, xlsx, auto_stem)
+    return xlsx, auto_stem
+
+
+def _sort_export(df):
+    """
+    Parst die Zeitraum-Spalte einmal vektorisiert und sortiert die Datensätze
+    danach (Zeile 0 bleibt Summenzeile). Rückgabe: ``(df, zeitraum)``;
+    ``zeitraum`` ist ``None``, wenn der Export keine Zeitraum-Spalte hat.
+    """
+    # Sortierschlüssel, von/bis und Anzeigetexte stammen alle aus diesem Ergebnis
+    zeitraum = None
+    if "Zeitraum" in df.columns:
+        zeitraum = parse_zeitraum(df["Zeitraum"])
+        try:
+            df, zeitraum = sort_by_zeitraum(df, zeitraum)
+        except Exception as e:
+            print("Fehler beim Sortieren nach Datum/Uhrzeit:", e)
+    return df, zeitraum
+
+
+def convert_records(records, user_dichtungen=None, streaming=False, timer=None):
+    """
+    Konvertiert Deal-Datensätze direkt, ohne Umweg über eine Excel-/CSV-Datei
+    (Format siehe ``records_to_dataframe``).
+
+    Rückgabe: ``(bytes, auto_stem)``.
+    """
+    timer = timer or _NO_TIMER
+    timer.lap("parse")
+    df = records_to_dataframe(records)
+    output = BytesIO()
+    _, auto_stem = convert_dataframe(df, output, user_dichtungen, streaming=streaming, timer=timer)
+    return output.getvalue(), auto_stem
+
+
+def convert_dataframe(df, output_path, user_dichtungen=None, streaming=False, timer=None):
+    """
+    Konvertiert einen bereits eingelesenen Export-DataFrame in die Packlisten-Vorlage.
+
+    Mit ``streaming=True`` werden die Datenzeilen direkt in eine write-only-Mappe
+    geschrieben (siehe ``save_streaming``); der Speicherbedarf bleibt dann
+    unabhängig von der Zeilenzahl. Das Ergebnis ist inhaltlich identisch.
+
+    ``output_path`` darf auch ein dateiähnliches Objekt (z. B. ``BytesIO``) sein.
+    Ein übergebener ``StageTimer`` erhält je Schrittgruppe einen Abschnitt
+    (im Streaming-Modus fällt das Schreiben der Datenzeilen unter ``save``).
+
+    Rückgabe: ``(output_path, auto_stem)`` – ``auto_stem`` ist der aus denselben
+    Daten abgeleitete Dateinamen-Stamm (siehe ``auto_stem_from_df``) oder ``None``.
+    """
+    timer = timer or _NO_TIMER
+
+    # 1)-3) Datensätze nach Datum/Uhrzeit sortieren (Zeile 0 bleibt Summenzeile)
+    timer.lap("sort")
+    df, zeitraum = _sort_export(df)
+    return convert_sorted(df, zeitraum, output_path, user_dichtungen, streaming=streaming, timer=timer)
+
+
+def convert_sorted(df, zeitraum, output_path, user_dichtungen=None, streaming=False, timer=None):
+    """
+    Wie ``convert_dataframe`` für einen bereits sortierten Export
+    (``df, zeitraum`` aus ``_sort_export``): nur noch Layout, Zellen und Speichern.
+    ``df`` wird dabei nicht verändert und kann erneut gerendert werden
+    (siehe ``convert_upload``).
+    """
+    timer = timer or _NO_TIMER
+
+    # 1) Template aus dem Cache holen (frische In-Memory-Kopie)
+    timer.lap("template")
+    wb, template_info = load_template()
+    ws = wb.active
+    styles = StyleRegistry(wb)
+
+    # 2)-3) Eingabedaten liegen bereits sortiert vor (siehe read_input_file / _sort_export)
+
+    # 4)-17) Arbeitsblatt füllen (siehe _fill_sheet)
+    row_writer, data_rows, n_data_rows, extra_line_row = _fill_sheet(
+        ws, styles, template_info, df, zeitraum, user_dichtungen, streaming=streaming, timer=timer
+    )
+
+    # 18) Speichern
+    timer.lap("save")
+    if streaming:
+        save_streaming(wb, ws, output_path, row_writer, data_rows, n_data_rows, extra_line_row)
+    else:
+        wb.save(output_path)
+    wb.close()
+    timer.stop()
+
+    return output_path, auto_stem_from_df(df, zeitraum)
+
+
+def effective_dichtungen(df, user_dichtungen=None, empty_mask=None):
+    """
+    Die für diesen Export verwendeten Dichtungen, sortiert (siehe
+    ``final_sort_dichtungen``): der übergebene bzw. gespeicherte Katalog, oder –
+    wenn dieser leer ist bzw. keine seiner Dichtungen als Spalte erscheinen
+    würde – die aus dem Export erratenen (``guess_dichtungen_from_df``).
+    """
+    if empty_mask is None:
+        empty_mask = empty_column_mask(df)
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+    if not user_dichtungen:
+        user_dichtungen = guess_dichtungen_from_df(df, empty_mask)
+
+    # mindestens eine Dichtung muss tatsächlich als Spalte erscheinen
+    if not select_visible_dichtungen(user_dichtungen, df, empty_mask):
+        user_dichtungen = guess_dichtungen_from_df(df, empty_mask)
+
+    return final_sort_dichtungen(user_dichtungen, df)
+
+
+def mainfield_columns(extra_cols):
+    """
+    Spalten der Hauptfelder, nachdem hinter der Platzhalter-Spalte ``extra_cols``
+    weitere Dichtungs-Spalten eingefügt wurden.
+    """
+    return [
+        (df_col, col_idx + extra_cols if col_idx > PLATZHALTER_COL_INDEX else col_idx)
+        for df_col, col_idx in TEMPLATE_MAINFIELD_COLS
+    ]
+
+
+def _fill_sheet(ws, styles, template_info, df, zeitraum, user_dichtungen=None, streaming=False, timer=None):
+    """
+    Füllt ein Vorlagenblatt mit dem sortierten Export (Schritte 4 bis 17 der
+    Konvertierung). ``zeitraum`` ist das zu ``df`` gehörende Ergebnis von
+    ``parse_zeitraum`` (oder ``None``).
+
+    Rückgabe: ``(row_writer, data_rows, n_data_rows, extra_line_row)`` – im
+    Streaming-Modus enthält ``data_rows`` die noch nicht geschriebenen Datenzeilen
+    für ``save_streaming``.
+    """
+    timer = timer or _NO_TIMER
+    original_width_info = template_info["width_info"]
+    original_width_ersatz = template_info["width_ersatz"]
+
+    # 4) Dichtungen laden bzw. erraten (siehe effective_dichtungen)
+    timer.lap("layout")
+    #    Leere Spalten werden einmal für den ganzen DataFrame ermittelt
+    empty_mask = empty_column_mask(df)
+
+    # 5) Template-Kopie liegt bereits vor (siehe Schritt 1 / load_template)
+
+    # 6) Dichtungen sortieren (ebenfalls in effective_dichtungen)
+    final_dichtungen = effective_dichtungen(df, user_dichtungen, empty_mask)
+
+    # 7) Kopfbereich (Technikername & Zeitraum)
+    serv_val = technician_name(df)
+    header_font = styles.font(name="Calibri", size=14, bold=True)
+    styles.apply(ws.cell(row=SERVICE_TECHNIKER_ROW, column=2, value=serv_val), font=header_font)
+    zr = get_zeitraum_von_bis(df, "Zeitraum", zeitraum)
+    styles.apply(ws.cell(row=DATE_ROW, column=2, value=zr), font=header_font)
+
+    # 8) Mapping Eingabespalten -> Template-Spalten
+    global_mainfield = list(TEMPLATE_MAINFIELD_COLS)
+
+    # 9) Dichtungs-Spalten ab PLATZHALTER_COL_INDEX (E)
+    #    Das Spalten-Layout wird vorab berechnet und in einem Schritt eingefügt.
+    visible_dichtungen = select_visible_dichtungen(final_dichtungen, df, empty_mask)
+    extra_cols = max(len(visible_dichtungen) - 1, 0)
+
+    # linke Rahmenlinie an der Platzhalter-Spalte; die Kopien übernehmen sie
+    if visible_dichtungen:
+        set_column_left_border(
+            ws, PLATZHALTER_COL_INDEX, start_row=1, border_style="thin", styles=styles
+        )
+    if extra_cols:
+        ws.insert_cols(PLATZHALTER_COL_INDEX + 1, amount=extra_cols)
+        copy_column_with_style(
+            ws, PLATZHALTER_COL_INDEX, PLATZHALTER_COL_INDEX + 1, count=extra_cols, styles=styles
+        )
+        # Mapping rechts verschieben
+        global_mainfield = mainfield_columns(extra_cols)
+
+    dicht_col_map = {}
+    for offset, dicht in enumerate(visible_dichtungen):
+        name = dicht.name
+        used_col = PLATZHALTER_COL_INDEX + offset
+
+        # Überschrift mit sinnvollem Zeilenumbruch (beim Laden vorberechnet)
+        head_cell = ws.cell(row=TEMPLATE_DICHTUNG_NAME_ROW, column=used_col, value=dicht.header)
+        styles.apply(
+            head_cell,
+            font=styles.font(name="Calibri", size=12, bold=True),
+            alignment=styles.alignment(horizontal="center", vertical="center", wrap_text=True),
+        )
+
+        # Summen-Zeile
+        sum_val_raw = safe_val(df, name, DF_SUM_ROW)
+        sum_num = parse_number(sum_val_raw)
+        sum_cell = ws.cell(row=TEMPLATE_SUM_ROW, column=used_col, value=round(sum_num))
+        sum_cell.number_format = "0"
+        styles.apply(
+            sum_cell,
+            font=styles.font(name="Calibri", size=16, color="FF0000"),
+            alignment=styles.alignment(horizontal="center", vertical="top", wrap_text=True),
+        )
+
+        dicht_col_map[name] = used_col
+
+    # Linie unter den Dichtungsnamen
+    set_bottom_solid(ws, TEMPLATE_DICHTUNG_NAME_ROW, styles=styles)
+
+    # 10) Datenzeilen übertragen – jede Zelle wird in einem Durchlauf genau einmal gestylt
+    timer.lap("rows")
+    BLUE_COLOR = "0000FF"
+    BLACK_COLOR = "000000"
+    dicht_font_colors = {
+        col_idx: BLUE_COLOR if i % 2 == 0 else BLACK_COLOR
+        for i, col_idx in enumerate(sorted(dicht_col_map.values()))
+    }
+    mainfield_by_col = {col: df_col for df_col, col in global_mainfield}
+    dicht_by_col = {col: name for name, col in dicht_col_map.items()}
+    max_col = ws.max_column
+
+    row_writer = DataRowWriter(ws, styles, TEMPLATE_DATA_START_ROW, max_col)
+    row_writer.set_column_style(
+        NUMBERING_COL,
+        font=styles.font(name="Calibri", size=12, bold=True),
+        alignment=styles.alignment(horizontal="right", vertical="top", wrap_text=True),
+    )
+    for col_idx, df_col in mainfield_by_col.items():
+        if df_col == "Zeitraum":
+            font = styles.font(name="Calibri", size=12, bold=True)
+        elif df_col in ["Informationen Packliste", "Ersatzteil und Zubehör", "Weitere Techniker"]:
+            font = styles.font(bold=True, color="FF0000")
+        else:
+            font = styles.font(name="Calibri", size=12, bold=False, color="000000")
+        row_writer.set_column_style(
+            col_idx,
+            font=font,
+            alignment=styles.alignment(horizontal="left", vertical="top", wrap_text=True),
+        )
+    for col_idx in dicht_by_col:
+        row_writer.set_column_style(
+            col_idx,
+            font=styles.font(name="Calibri", size=12, bold=False, color=dicht_font_colors[col_idx]),
+            alignment=styles.alignment(horizontal="center", vertical="top", wrap_text=True),
+        )
+
+    # Zellwerte spaltenweise vorbereiten; der Writer bekommt nur noch fertige Tupel
+    data_rows = prepare_data_rows(df, zeitraum, mainfield_by_col, dicht_by_col, max_col)
+    n_data_rows = max(len(df) - DF_DATA_START_ROW, 0)
+    if streaming:
+        # nur die erste Datenzeile kommt in die Vorlage (Vorbild für die Zusatzzeile),
+        # alle weiteren werden beim Speichern direkt in die Datei gestreamt
+        data_rows_in_sheet = itertools.islice(data_rows, 1)
+    else:
+        data_rows_in_sheet = data_rows
+
+    t_row = TEMPLATE_DATA_START_ROW
+    for values, odd, numeric in data_rows_in_sheet:
+        row_writer.write_row(t_row, values, odd, numeric)
+        t_row += 1
+
+    # 11) Zusätzliche-Dichtungen-Zeile
+    timer.lap("extra_row")
+    extra_line_row = t_row
+    ws.insert_rows(idx=extra_line_row)
+    copy_entire_row_format(ws, TEMPLATE_DATA_START_ROW, extra_line_row, styles=styles)
+    set_top_border_solid(ws, extra_line_row, styles=styles)
+    set_bottom_thick(ws, extra_line_row, styles=styles)
+
+    extra_text_cell = ws.cell(row=extra_line_row, column=3, value="zusätzliche Dichtungen")
+    styles.apply(
+        extra_text_cell,
+        font=styles.font(bold=True),
+        alignment=styles.alignment(horizontal="left", vertical="top", wrap_text=True),
+    )
+
+    last_used_df_row = len(df)
+    bg_color = "DDDDDD" if (last_used_df_row % 2 == 1) else "FFFFFF"
+    for col_idx in range(1, ws.max_column + 1):
+        styles.apply(ws.cell(row=extra_line_row, column=col_idx), fill=styles.fill(bg_color))
+
+    # 12) Standard-Dichtungen in der zusätzlichen Zeile vorbelegen
+    for dicht in final_dichtungen:
+        if not dicht.always_show:
+            continue
+        name = dicht.name
+        if not name or name not in dicht_col_map:
+            continue
+        col_idx = dicht_col_map[name]
+        fix_value_num = dicht.default_num
+        c = ws.cell(row=extra_line_row, column=col_idx, value=fix_value_num)
+        c.number_format = "0"
+        styles.apply(
+            c,
+            alignment=styles.alignment(horizontal="center", vertical="top", wrap_text=True),
+            font=styles.font(name="Calibri", size=12, bold=False),
+        )
+
+        old_sum = ws.cell(row=TEMPLATE_SUM_ROW, column=col_idx).value
+        old_sum = old_sum if isinstance(old_sum, (int, float)) else 0
+        new_sum = old_sum + fix_value_num
+        s_cell = ws.cell(row=TEMPLATE_SUM_ROW, column=col_idx, value=new_sum)
+        s_cell.number_format = "0"
+        styles.apply(
+            s_cell,
+            font=styles.font(name="Calibri", size=16, bold=False, color="FF0000"),
+            alignment=styles.alignment(horizontal="center", vertical="top", wrap_text=True),
+        )
+
+    # 13) Info/Ersatzteil-Spaltenbreite aus Template übernehmen
+    timer.lap("columns")
+    for field, orig_width in [
+        ("Informationen Packliste", original_width_info),
+        ("Ersatzteil und Zubehör", original_width_ersatz),
+    ]:
+        col_idx = next((col for df_field, col in global_mainfield if df_field == field), None)
+        if col_idx is not None and orig_width:
+            col_letter = get_column_letter(col_idx)
+            ws.column_dimensions[col_letter].width = orig_width
+
+    # 14) Bestimmte Spalten ausblenden, wenn sie komplett leer sind
+    for field in OPTIONAL_FIELDS:
+        col_idx = next((col for (df_field, col) in global_mainfield if df_field == field), None)
+        if col_idx is None:
+            continue
+        col_letter = get_column_letter(col_idx)
+        if empty_mask.get(field, True):
+            ws.column_dimensions[col_letter].hidden = True
+        else:
+            ws.column_dimensions[col_letter].hidden = False
+
+    # 15) Leere Zeilen am Ende entfernen
+    timer.lap("trim")
+    remove_trailing_blank_rows(ws, extra_line_row)
+
+    # 16) Schriftfarbe der Dichtungs-Spalten alternierend blau/schwarz
+    timer.lap("recolor")
+    #     (Datenzeilen sind bereits in Schritt 10 eingefärbt)
+    color_rows = list(range(1, TEMPLATE_DATA_START_ROW)) + list(range(extra_line_row, ws.max_row + 1))
+    for col_idx, font_color in dicht_font_colors.items():
+        for row_idx in color_rows:
+            cell = ws.cell(row=row_idx, column=col_idx)
+            styles.apply(cell, font=styles.font_with_color(cell, font_color))
+
+    # 17) Dichtungs-Spaltenbreiten anpassen
+    adjust_dichtung_column_widths(ws, dicht_col_map)
+
+    return row_writer, data_rows, n_data_rows, extra_line_row
+
+
+# ------------------------------------------------------------
+# Stapelkonvertierung (mehrere Exporte -> ein ZIP)
+# ------------------------------------------------------------
+
+def _warm_batch_worker():
+    # Vorlage einmal pro Worker-Prozess parsen
+    try:
+        load_template()
+    except FileNotFoundError as e:
+        print("Vorlage konnte nicht vorgeladen werden:", e)
+
+
+def _convert_batch_item(item):
+    """
+    Konvertiert einen Eintrag ``(filename, data, user_dichtungen)`` im Worker.
+    Rückgabe: ``(filename, xlsx_bytes, auto_stem, fehlertext)``.
+    """
+    filename, data, user_dichtungen = item
+    try:
+        xlsx, auto_stem = convert_bytes(data, filename, user_dichtungen, use_cache=False)
+    except Exception as e:
+        return filename, None, None, str(e)
+    return filename, xlsx, auto_stem, None
+
+
+def convert_batch(files, user_dichtungen=None, max_workers=None):
+    """
+    Konvertiert mehrere Export-Dateien parallel und packt die Packlisten in ein ZIP.
+
+    ``files`` ist eine Liste von ``(filename, data)`` mit den Dateiinhalten als Bytes.
+    Die Konvertierungen laufen in einem ``ProcessPoolExecutor`` (Standard: ein
+    Prozess pro CPU-Kern). Die Dateinamen im ZIP folgen ``auto_stem_from_df``;
+    ohne automatischen Namen wird der Name der Eingabedatei verwendet.
+    Fehlgeschlagene Dateien werden in ``FEHLER.txt`` im ZIP aufgelistet.
+    Bereits bekannte Dateien kommen aus ``result_cache``, nur der Rest geht an den Pool.
+
+    Rückgabe: ``(zip_bytes, fehler)`` – ``fehler`` ist eine Liste von
+    ``(filename, fehlertext)``.
+    """
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+
+    results = [None] * len(files)
+    keys = {}
+    pending = []
+    for i, (filename, data) in enumerate(files):
+        key = result_cache_key(data, filename, user_dichtungen)
+        cached = result_cache.get(key)
+        if cached is not None:
+            results[i] = (filename, cached[0], cached[1], None)
+        else:
+            keys[i] = key
+            pending.append(i)
+
+    items = [(files[i][0], files[i][1], user_dichtungen) for i in pending]
+    converted = _run_in_pool(_convert_batch_item, items, max_workers)
+
+    for i, result in zip(pending, converted):
+        results[i] = result
+        _, xlsx, auto_stem, error = result
+        if error is None:
+            result_cache.put(keys[i], xlsx, auto_stem)
+
+    return _zip_results(results)
+
+
+def _run_in_pool(func, items, max_workers=None):
+    """Führt ``func`` für alle ``items`` aus – parallel, sobald es sich lohnt."""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(items)))
+
+    if max_workers == 1:
+        return [func(item) for item in items]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_batch_worker) as pool:
+        return list(pool.map(func, items))
+
+
+def _zip_results(results):
+    """
+    Packt ``(label, xlsx_bytes, auto_stem, fehlertext)``-Ergebnisse in ein ZIP.
+    Rückgabe: ``(zip_bytes, fehler)``.
+    """
+    errors = []
+    used_names = set()
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for label, xlsx, auto_stem, error in results:
+            if error is not None:
+                print(f"Fehler bei der Konvertierung von {label}:", error)
+                errors.append((label, error))
+                continue
+
+            stem = auto_stem or f"{Path(label).stem}_packliste"
+            name = f"{stem}.xlsx"
+            counter = 2
+            while name in used_names:
+                name = f"{stem}_{counter}.xlsx"
+                counter += 1
+            used_names.add(name)
+            zf.writestr(name, xlsx)
+
+        if errors:
+            zf.writestr("FEHLER.txt", "\n".join(f"{fn}: {err}" for fn, err in errors) + "\n")
+
+    return buf.getvalue(), errors
+
+
+# ------------------------------------------------------------
+# Aufteilen nach Service-Techniker (ein Export -> eine Packliste je Techniker)
+# ------------------------------------------------------------
+
+def _quantities(series):
+    # Mengen als Zahlen (Dezimalkomma erlaubt), Texte -> NaN
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        return series.astype(float)
+    values = series.astype(object).map(lambda v: v.replace(",", ".") if isinstance(v, str) else v)
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _dichtung_quantities(data):
+    # Mengen aller Dichtungsspalten (alle Spalten außer den Hauptfeldern) in einem Durchlauf
+    return pd.DataFrame(
+        {col: _quantities(data[col]) for col in data.columns if col not in MAIN_FIELDS},
+        index=data.index,
+    )
+
+
+def _group_sum_row(part, quantities=None):
+    """
+    Summenzeile für eine Teilmenge der Datenzeilen: Summe je Dichtungsspalte
+    (alle Spalten außer den Hauptfeldern), sofern sie Mengen enthält.
+    ``quantities`` sind optional die bereits umgerechneten Mengen dieser Zeilen
+    (siehe ``_dichtung_quantities``), damit viele Gruppen nur einmal umrechnen.
+    """
+    if quantities is None:
+        quantities = _dichtung_quantities(part)
+    sums = {col: np.nan for col in part.columns}
+    sums.update(quantities.sum(min_count=1).to_dict())
+    return pd.DataFrame([sums], columns=part.columns)
+
+
+def split_by_technician(df):
+    """
+    Teilt einen Export nach "Service Techniker" auf.
+
+    Rückgabe: Liste von ``(techniker, teil_df)`` in der Reihenfolge des ersten
+    Auftretens. Jedes ``teil_df`` hat wieder eine Summenzeile an Index 0, die aus
+    den Zeilen des Technikers neu berechnet wird (die exportierte Summenzeile
+    gilt für alle Techniker zusammen).
+    """
+    data = df.iloc[DF_DATA_START_ROW:]
+    if "Service Techniker" not in df.columns or data.empty:
+        return [(technician_name(df), df)]
+
+    key = data["Service Techniker"].astype(object).where(data["Service Techniker"].notna(), "")
+    key = key.astype(str).str.strip()
+    quantities = _dichtung_quantities(data)
+    groups = []
+    for name in pd.unique(key):
+        mask = key == name
+        part = data[mask]
+        groups.append((name, pd.concat([_group_sum_row(part, quantities[mask]), part], ignore_index=True)))
+    return groups
+
+
+def _convert_group_item(item):
+    """
+    Konvertiert den Teil-DataFrame eines Technikers im Worker.
+    Rückgabe: ``(techniker, xlsx_bytes, auto_stem, fehlertext)``.
+    """
+    label, part, user_dichtungen = item
+    try:
+        output = BytesIO()
+        _, auto_stem = convert_dataframe(part, output, user_dichtungen)
+    except Exception as e:
+        return label, None, None, str(e)
+    return label, output.getvalue(), auto_stem, None
+
+
+def convert_split(df, user_dichtungen=None, max_workers=None):
+    """
+    Erzeugt aus einem Export mit mehreren Technikern eine Packliste je Techniker.
+
+    Die Gruppen (siehe ``split_by_technician``) werden parallel in einem
+    ``ProcessPoolExecutor`` gerendert und als ZIP mit einer Datei je Techniker
+    geliefert (Namen wie bei ``auto_stem_from_df``).
+
+    Rückgabe: ``(zip_bytes, fehler)`` wie bei ``convert_batch``.
+    """
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+    items = [
+        (name or "ohne_Techniker", part, user_dichtungen)
+        for name, part in split_by_technician(df)
+    ]
+    return _zip_results(_run_in_pool(_convert_group_item, items, max_workers))
+
+
+# ------------------------------------------------------------
+# Wochenmappe: ein Arbeitsblatt je Tag
+# ------------------------------------------------------------
+
+# Blatt-Einstellungen, die ``Workbook.copy_worksheet`` nicht selbst übernimmt
+_COPY_SHEET_SETTINGS = ("views", "HeaderFooter", "_print_area", "_print_rows", "_print_cols")
+
+
+def copy_template_sheet(wb, ws):
+    """
+    Legt in derselben Mappe eine Kopie des (noch unveränderten) Vorlagenblatts an.
+
+    Zellen übernehmen nur ihre Stil-IDs; die Style-Tabellen der Mappe (und damit
+    eine gemeinsame ``StyleRegistry``) gelten für alle Blätter. Die Vorlage
+    muss dafür nicht erneut geladen werden.
+    """
+    target = wb.copy_worksheet(ws)
+    for attr in _COPY_SHEET_SETTINGS:
+        setattr(target, attr, deepcopy(getattr(ws, attr)))
+    # nur ein Blatt darf ausgewählt sein, sonst öffnet Excel die Blätter gruppiert
+    target.sheet_view.tabSelected = False
+    return target
+
+
+def day_sheet_title(day):
+    """Blattname für einen Tag, z.B. 'MO 24.11.25' (ohne Datum: 'ohne Datum')."""
+    if day is None:
+        return "ohne Datum"
+    return f"{weekday_map.get(day.weekday(), '')} {day:%d.%m.%y}"
+
+
+def split_by_day(df, zeitraum):
+    """
+    Teilt einen nach Zeitraum sortierten Export nach dem Datum auf.
+
+    Rückgabe: Liste von ``(tag, teil_df, teil_zeitraum)`` in Datumsreihenfolge;
+    Zeilen ohne gültiges Datum folgen zuletzt mit ``tag=None``. Jedes ``teil_df``
+    hat wieder eine Summenzeile an Index 0, die aus den Zeilen des Tages neu
+    berechnet wird; ``teil_zeitraum`` ist der passende Ausschnitt von ``zeitraum``.
+    """
+    data = df.iloc[DF_DATA_START_ROW:]
+    if zeitraum is None or data.empty:
+        return [(None, df, zeitraum)]
+
+    dates = zeitraum["date"].iloc[DF_DATA_START_ROW:]
+    valid = dates.notna()
+    groups = [(day, part.index) for day, part in dates[valid].groupby(dates[valid], sort=True)]
+    if not valid.all():
+        groups.append((None, dates.index[~valid]))
+
+    quantities = _dichtung_quantities(data)
+    days = []
+    for day, idx in groups:
+        part = df.loc[idx]
+        sum_row = _group_sum_row(part, quantities.loc[idx])
+        part_zeitraum = pd.concat(
+            [parse_zeitraum(sum_row["Zeitraum"]), zeitraum.loc[idx]], ignore_index=True
+        )
+        days.append((day, pd.concat([sum_row, part], ignore_index=True), part_zeitraum))
+    return days
+
+
+def convert_by_day(df, output_path, user_dichtungen=None, timer=None):
+    """
+    Wie ``convert_dataframe``, aber mit einem Arbeitsblatt je Tag
+    (Blattnamen siehe ``day_sheet_title``, Aufteilung siehe ``split_by_day``).
+
+    Die Vorlage wird nur einmal aus dem Cache geholt; alle Tagesblätter sind
+    Kopien des Vorlagenblatts in derselben Mappe (``copy_template_sheet``) und
+    teilen sich eine ``StyleRegistry``. Ein Streaming-Modus ist hier nicht vorgesehen.
+
+    Rückgabe: ``(output_path, auto_stem)`` – ``auto_stem`` gilt für den ganzen Export.
+    """
+    timer = timer or _NO_TIMER
+    if user_dichtungen is None:
+        user_dichtungen = load_dichtungen()
+
+    timer.lap("template")
+    wb, template_info = load_template()
+    template_ws = wb.active
+    styles = StyleRegistry(wb)
+
+    timer.lap("sort")
+    df, zeitraum = _sort_export(df)
+    days = split_by_day(df, zeitraum)
+
+    # Kopien ziehen, solange das Vorlagenblatt noch leer ist; es selbst wird zum ersten Tag
+    sheets = [template_ws] + [copy_template_sheet(wb, template_ws) for _ in days[1:]]
+    for ws, (day, part, part_zeitraum) in zip(sheets, days):
+        ws.title = day_sheet_title(day)
+        _fill_sheet(ws, styles, template_info, part, part_zeitraum, user_dichtungen, timer=timer)
+
+    timer.lap("save")
+    wb.active = 0
+    wb.save(output_path)
+    wb.close()
+    timer.stop()
+
+    return output_path, auto_stem_from_df(df, zeitraum)
+
+
+# ------------------------------------------------------------
+# Eingelesene Uploads (erneutes Rendern mit anderen Dichtungen)
+# ------------------------------------------------------------
+
+class UploadCache:
+    """
+    Kurzlebiger Speicher für eingelesene und sortierte Exporte.
+
+    ``put`` legt ``(df, zeitraum)`` unter einem neuen Upload-Token ab; ``get``
+    liefert den Eintrag, solange er innerhalb von ``ttl`` Sekunden zuletzt benutzt
+    wurde. Darüber hinaus werden die am längsten unbenutzten Einträge verworfen,
+    sobald mehr als ``max_entries`` vorliegen.
+    """
+
+    def __init__(self, ttl=UPLOAD_TTL_SECONDS, max_entries=UPLOAD_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if now - entry["used"] <= self.ttl and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[token]
+
+    def put(self, df, zeitraum, filename):
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._entries[token] = {"df": df, "zeitraum": zeitraum, "filename": filename, "used": now}
+            self._expire(now)
+        return token
+
+    def get(self, token):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            entry["used"] = now
+            self._entries.move_to_end(token)
+            return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+upload_cache = UploadCache()
+
+
+def parse_upload(data, filename):
+    """
+    Liest einen Upload vollständig ein (alle Spalten, da sich die Dichtungen
+    danach noch ändern dürfen), sortiert ihn und legt ihn in ``upload_cache`` ab.
+
+    Rückgabe: Upload-Token für ``convert_upload``.
+    """
+    df = read_input_file(BytesIO(data), filename)
+    df, zeitraum = _sort_export(df)
+    return upload_cache.put(df, zeitraum, filename)
+
+
+def convert_upload(token, user_dichtungen=None, streaming=False, timer=None):
+    """
+    Rendert einen mit ``parse_upload`` abgelegten Export erneut, z.B. nach einer
+    Änderung des Dichtungs-Katalogs. Einlesen und Sortieren entfallen; es laufen
+    nur Layout, Zellen und Speichern (``convert_sorted``).
+
+    Rückgabe: ``(bytes, auto_stem)`` oder ``None``, wenn das Token unbekannt
+    oder abgelaufen ist.
+    """
+    entry = upload_cache.get(token)
+    if entry is None:
+        return None
+    output = BytesIO()
+    _, auto_stem = convert_sorted(
+        entry["df"], entry["zeitraum"], output, user_dichtungen, streaming=streaming, timer=timer
+    )
+    return output.getvalue(), auto_stem
+
+
+# ------------------------------------------------------------
+# Vorschau ohne Excel
+# ------------------------------------------------------------
+
+def _preview_value(value, numeric):
+    # JSON-taugliche Zellwerte: Mengen sind bereits int, fehlende Werte -> None
+    if numeric or isinstance(value, (int, str)):
+        return value
+    if value is None or pd.isna(value):
+        return None
+    return str(value)
+
+
+def preview_sorted(df, zeitraum, user_dichtungen=None):
+    """
+    Datenvorschau der Packliste für einen sortierten Export, ohne Vorlage und openpyxl.
+
+    Es laufen dieselben Datenschritte wie bei ``convert_sorted``: Dichtungen
+    (``effective_dichtungen``) und ihre Sichtbarkeit, Spaltenreihenfolge,
+    Summen inkl. Standardwerten, Zeitraum-Anzeige und ausgeblendete Hauptfelder.
+
+    Rückgabe: dict mit
+      - ``technician``, ``period``, ``auto_stem``: Kopfbereich bzw. Dateinamen-Stamm
+      - ``columns``: je Spalte ``{"title", "kind", "hidden"}`` mit ``kind`` in
+        ``number``/``field``/``dichtung``; Dichtungen zusätzlich mit ``header``,
+        ``sum`` (Summenzeile) und ``extra`` (Vorbelegung der Zusatzzeile oder ``None``)
+      - ``rows``: Datenzeilen als Listen in Spaltenreihenfolge
+    """
+    empty_mask = empty_column_mask(df)
+    final_dichtungen = effective_dichtungen(df, user_dichtungen, empty_mask)
+    visible = select_visible_dichtungen(final_dichtungen, df, empty_mask)
+
+    extra_cols = max(len(visible) - 1, 0)
+    mainfield_by_col = {col: field for field, col in mainfield_columns(extra_cols)}
+    dicht_by_col = {PLATZHALTER_COL_INDEX + offset: d for offset, d in enumerate(visible)}
+    max_col = max(mainfield_by_col)
+
+    columns = {NUMBERING_COL: {"title": "Nr.", "kind": "number", "hidden": False}}
+    for col_idx, field in mainfield_by_col.items():
+        hidden = field in OPTIONAL_FIELDS and empty_mask.get(field, True)
+        columns[col_idx] = {"title": field, "kind": "field", "hidden": hidden}
+    for col_idx, dicht in dicht_by_col.items():
+        extra = dicht.default_num if dicht.always_show else None
+        columns[col_idx] = {
+            "title": dicht.name,
+            "kind": "dichtung",
+            "hidden": False,
+            "header": dicht.header,
+            "sum": round(parse_number(safe_val(df, dicht.name, DF_SUM_ROW))) + (extra or 0),
+            "extra": extra,
+        }
+
+    used = sorted(columns)
+    data_rows = prepare_data_rows(
+        df, zeitraum, mainfield_by_col, {col: d.name for col, d in dicht_by_col.items()}, max_col
+    )
+    rows = [
+        [_preview_value(values[col - 1], numeric[col - 1]) for col in used]
+        for values, _, numeric in data_rows
+    ]
+
+    return {
+        "technician": technician_name(df),
+        "period": get_zeitraum_von_bis(df, "Zeitraum", zeitraum),
+        "auto_stem": auto_stem_from_df(df, zeitraum),
+        "columns": [columns[col] for col in used],
+        "rows": rows,
+    }
+
+
+def preview_dataframe(df, user_dichtungen=None):
+    """Wie ``preview_sorted`` für einen eingelesenen, noch unsortierten Export."""
+    df, zeitraum = _sort_export(df)
+    return preview_sorted(df, zeitraum, user_dichtungen)
+
+
+def preview_upload(token, user_dichtungen=None):
+    """
+    Vorschau für einen mit ``parse_upload`` abgelegten Export.
+    Rückgabe: wie ``preview_sorted`` oder ``None``, wenn das Token unbekannt ist.
+    """
+    entry = upload_cache.get(token)
+    if entry is None:
+        return None
+    return preview_sorted(entry["df"], entry["zeitraum"], user_dichtungen)
+
+
+# ------------------------------------------------------------
+# Hintergrund-Jobs (asynchrone Konvertierung)
+# ------------------------------------------------------------
+
+class JobQueue:
+    """
+    Führt Konvertierungen im Hintergrund in einem lokalen Prozess-Pool aus.
+
+    ``submit`` legt einen Job an und kehrt sofort mit der Job-ID zurück;
+    ``get`` liefert den aktuellen Stand (``queued``/``running``/``done``/``error``)
+    und nach Abschluss das Ergebnis. Fertige Jobs werden nach ``ttl`` Sekunden
+    verworfen. Der Zustand liegt im Speicher des Web-Prozesses.
+    """
+
+    def __init__(self, max_workers=None, ttl=JOB_TTL_SECONDS):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        # Pool erst bei Bedarf starten (nach dem Fork des Web-Servers)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_batch_worker)
+        return self._pool
+
+    def _submit(self, func, item):
+        # Stirbt ein Worker (z. B. OOM-Kill), bleibt der Pool dauerhaft defekt:
+        # dann einmal durch einen neuen Pool ersetzen und erneut einreichen.
+        # Laufende Jobs des alten Pools schlagen fehl und werden in _finish erfasst.
+        try:
+            return self._executor().submit(func, item)
+        except BrokenProcessPool:
+            print("Worker-Pool defekt, wird neu gestartet")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            return self._executor().submit(func, item)
+
+    def _expire(self, now):
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished"] is not None and now - job["finished"] > self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, data, filename, user_dichtungen=None, meta=None):
+        """
+        Reiht eine Konvertierung ein. ``meta`` wird unverändert am Job abgelegt
+        (z. B. der gewünschte Dateiname). Rückgabe: Job-ID.
+        """
+        if user_dichtungen is None:
+            user_dichtungen = load_dichtungen()
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        key = result_cache_key(data, filename, user_dichtungen)
+        job = {
+            "filename": filename,
+            "meta": meta or {},
+            "created": now,
+            "finished": None,
+            "future": None,
+            "xlsx": None,
+            "auto_stem": None,
+            "error": None,
+        }
+
+        cached = result_cache.get(key)
+        if cached is not None:
+            job.update(xlsx=cached[0], auto_stem=cached[1], finished=now)
+
+        with self._lock:
+            self._expire(now)
+            if cached is None:
+                job["future"] = self._submit(_convert_batch_item, (filename, data, user_dichtungen))
+            self._jobs[job_id] = job
+
+        if cached is None:
+            job["future"].add_done_callback(lambda fut: self._finish(job_id, key, fut))
+        return job_id
+
+    def _finish(self, job_id, key, future):
+        try:
+            _, xlsx, auto_stem, error = future.result()
+        except Exception as e:
+            xlsx, auto_stem, error = None, None, str(e)
+        if error is not None:
+            print(f"Fehler bei der Konvertierung (Job {job_id}):", error)
+        else:
+            result_cache.put(key, xlsx, auto_stem)
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(xlsx=xlsx, auto_stem=auto_stem, error=error, finished=time.time())
+
+    def get(self, job_id):
+        """
+        Liefert den Stand eines Jobs als Dict oder ``None``, wenn die ID
+        unbekannt bzw. abgelaufen ist.
+        """
+        with self._lock:
+            self._expire(time.time())
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            if job["finished"] is not None:
+                status = "error" if job["error"] is not None else "done"
+            elif job["future"] is not None and job["future"].running():
+                status = "running"
+            else:
+                status = "queued"
+
+            return {
+                "id": job_id,
+                "status": status,
+                "filename": job["filename"],
+                "meta": job["meta"],
+                "error": job["error"],
+                "xlsx": job["xlsx"],
+                "auto_stem": job["auto_stem"],
+            }
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# packliste_core.py liegt im Projektverzeichnis, nicht in einem Paket
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
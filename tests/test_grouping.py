@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Aufteilen eines Team-Exports nach Techniker und nach Tag. Die Summenzeile jeder
+Gruppe wird aus deren Zeilen neu berechnet; die exportierte Summenzeile der
+Fixture (überall 99) darf nirgends übernommen werden.
+"""
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from packliste_core import (
+    _sort_export,
+    convert_by_day,
+    day_sheet_title,
+    read_input_file,
+    split_by_day,
+    split_by_technician,
+)
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "team_woche.csv"
+
+QUANTITY_COLS = ["10/4_S", "12/5_B", "14/7_B", "4/4_W"]
+
+DICHTUNGEN = [
+    {"name": name, "always_show": False, "default_value": 0, "order": ""}
+    for name in QUANTITY_COLS
+]
+
+
+def sums(part):
+    # Summenzeile an Index 0, fehlende Summen als None
+    row = part.iloc[0]
+    return [None if row[col] != row[col] else float(row[col]) for col in QUANTITY_COLS]
+
+
+@pytest.fixture
+def export():
+    return read_input_file(str(FIXTURE))
+
+
+def test_split_by_technician_recomputes_sums(export):
+    groups = dict(split_by_technician(export))
+
+    assert list(groups) == ["Daniel Oberrauner", "Petra Mayr"]
+    # 14/7_B: 1,5 + 2,5 aus Dezimalkomma-Werten
+    assert sums(groups["Daniel Oberrauner"]) == [7.0, 2.0, 4.0, None]
+    assert sums(groups["Petra Mayr"]) == [1.0, 4.0, 1.0, 0.5]
+    assert [len(part) - 1 for part in groups.values()] == [3, 2]
+
+
+def test_split_by_day_recomputes_sums(export):
+    days = split_by_day(*_sort_export(export))
+
+    assert [day_sheet_title(day) for day, _, _ in days] == [
+        "MO 24.11.25", "DI 25.11.25", "MI 26.11.25", "ohne Datum",
+    ]
+    # Montag: beide Techniker, 2,5 + 0,5 aus Dezimalkomma-Werten
+    assert sums(days[0][1]) == [2.0, 3.0, 2.5, 0.5]
+    assert sums(days[1][1]) == [2.0, None, 1.5, None]
+    assert sums(days[2][1]) == [None, 1.0, 1.0, None]
+    assert sums(days[3][1]) == [4.0, 2.0, None, None]
+    assert list(days[0][1]["Service Techniker"].iloc[1:]) == ["Daniel Oberrauner", "Petra Mayr"]
+
+
+def test_convert_by_day_writes_one_sheet_per_day(export):
+    output = BytesIO()
+    convert_by_day(export, output, DICHTUNGEN)
+    output.seek(0)
+    wb = load_workbook(output)
+
+    assert wb.sheetnames == ["MO 24.11.25", "DI 25.11.25", "MI 26.11.25", "ohne Datum"]
+    ws = wb["MO 24.11.25"]
+    assert ws["E2"].value == "10/4\nS"
+    assert ws["E1"].value == 2
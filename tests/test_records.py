@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Deal-Datensätze (Zoho-API-Antwort) werden wie ein Export konvertiert:
+Lookup-Felder werden zu Namen, die Summenzeile wird aus den Datensätzen
+berechnet.
+"""
+
+import json
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from packliste_core import convert_records, records_to_dataframe
+
+RECORDS = Path(__file__).resolve().parent.parent / "beispiele" / "zoho_records.json"
+
+# fester Katalog ohne always_show, damit die Summen nur aus den Datensätzen kommen
+DICHTUNGEN = [
+    {"name": "10/4_S", "always_show": False, "default_value": 0, "order": ""},
+    {"name": "12/5_B", "always_show": False, "default_value": 0, "order": ""},
+    {"name": "14/7_B", "always_show": False, "default_value": 0, "order": ""},
+]
+
+
+def load_records():
+    with open(RECORDS, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def test_records_are_converted():
+    data, stem = convert_records(load_records(), DICHTUNGEN)
+    ws = load_workbook(BytesIO(data)).active
+
+    # "Service Techniker" ist ein Lookup {"name": ..., "id": ...}
+    assert ws["B1"].value == "Daniel Oberrauner"
+    assert ws["B2"].value == "24.11.2025 - 28.11.2025"
+    assert stem == "DanielOberrauner_24112025-28112025"
+
+    # Summenzeile neu berechnet: 10/4_S = 2 + 1, 12/5_B = 4 + 2
+    assert ws["E2"].value == "10/4\nS"
+    assert ws["E1"].value == 3
+    assert ws["F2"].value == "12/5\nB"
+    assert ws["F1"].value == 6
+
+
+def test_record_fields_are_flattened():
+    df = records_to_dataframe(load_records())
+    data = df.iloc[1:]
+
+    assert list(data["Service Techniker"]) == ["Daniel Oberrauner"] * 3
+    # Mehrfachauswahl als Liste, Mengen mit Dezimalkomma
+    assert "Hans Huber" in list(data["Weitere Techniker"])
+    assert df.loc[0, "14/7_B"] == pytest.approx(3.5)
+
+
+@pytest.mark.parametrize("records", [[], {"data": []}])
+def test_empty_records_are_rejected(records):
+    with pytest.raises(ValueError):
+        records_to_dataframe(records)
+    with pytest.raises(ValueError):
+        convert_records(records, DICHTUNGEN)
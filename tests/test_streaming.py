@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Der Streaming-Modus (``streaming=True``) muss dieselbe Packliste liefern wie
+die normale Konvertierung: Zellwerte, Zahlenformate, Schrift, Füllung, Rahmen,
+Ausrichtung und Spaltenbreiten. Nicht verglichen werden ``<dimension>`` und
+Zeitstempel der Datei.
+"""
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from packliste_core import convert_file
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+# fester Katalog, damit der Test nicht von dichtungen.json abhängt
+DICHTUNGEN = [
+    {"name": "10/4_S", "always_show": True, "default_value": 150, "order": ""},
+    {"name": "12/5_B", "always_show": False, "default_value": 0, "order": ""},
+    {"name": "14/7_B", "always_show": False, "default_value": 0, "order": ""},
+    {"name": "4/4_W", "always_show": False, "default_value": 0, "order": ""},
+]
+
+
+def convert(name, streaming):
+    output = BytesIO()
+    convert_file(str(FIXTURES / name), output, DICHTUNGEN, streaming=streaming)
+    output.seek(0)
+    return load_workbook(output).active
+
+
+def cell_snapshot(cell):
+    return (
+        cell.value,
+        cell.number_format,
+        repr(cell.font),
+        repr(cell.fill),
+        repr(cell.border),
+        repr(cell.alignment),
+    )
+
+
+@pytest.mark.parametrize("name", ["export_klein.csv", "nur_summenzeile.csv"])
+def test_streaming_matches_normal_output(name):
+    normal = convert(name, streaming=False)
+    streamed = convert(name, streaming=True)
+
+    max_row = max(normal.max_row, streamed.max_row)
+    max_col = max(normal.max_column, streamed.max_column)
+    for row in range(1, max_row + 1):
+        for col in range(1, max_col + 1):
+            assert cell_snapshot(streamed.cell(row, col)) == cell_snapshot(normal.cell(row, col)), (row, col)
+
+    def columns(ws):
+        return {key: (dim.width, dim.hidden) for key, dim in ws.column_dimensions.items()}
+
+    assert columns(streamed) == columns(normal)
+    assert sorted(map(str, streamed.merged_cells.ranges)) == sorted(map(str, normal.merged_cells.ranges))
+
+
+def test_fixture_content_is_converted():
+    ws = convert("export_klein.csv", streaming=False)
+
+    assert ws["B1"].value == "Daniel Oberrauner"
+    assert ws["B2"].value == "24.11.2025 - 28.11.2025"
+    # Datenzeilen nach Zeitraum sortiert
+    assert [ws.cell(row, 2).value[:2] for row in range(3, 7)] == ["MO", "DI", "MI", "FR"]
+    assert ws.cell(7, 3).value == "zusätzliche Dichtungen"
+
+
+def test_sum_row_only_export_has_no_data_rows():
+    ws = convert("nur_summenzeile.csv", streaming=False)
+
+    assert ws.cell(3, 3).value == "zusätzliche Dichtungen"